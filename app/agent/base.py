@@ -1,12 +1,20 @@
 from abc import ABC, abstractmethod
 from contextlib import asynccontextmanager
-from typing import List, Literal, Optional
+from typing import ClassVar, Dict, List, Literal, Optional, Tuple
 import asyncio
+import hashlib
+import json
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
 
 from app.llm import LLM
 from app.logger import logger
+from app.prompt.compaction import (
+    SUMMARY_MESSAGE,
+    SUMMARY_PROMPT,
+    SUMMARY_TOOL_CALL,
+    SYSTEM_PROMPT,
+)
 from app.schema import AgentState, Memory, Message
 
 
@@ -42,6 +50,20 @@ class BaseAgent(BaseModel, ABC):
 
     duplicate_threshold: int = 2
 
+    # Memory compaction: once history exceeds this many tokens, older turns are
+    # summarized by the LLM in the background (None: the LLM config's
+    # `compaction_threshold`, or 3/4 of its `max_input_tokens`)
+    compaction_threshold: Optional[int] = Field(
+        default=None, description="History size (tokens) that triggers compaction"
+    )
+    compaction_keep_messages: int = Field(
+        default=10, description="Recent messages kept verbatim when compacting"
+    )
+
+    _compaction_task: Optional[asyncio.Task] = PrivateAttr(default=None)
+    _summary_cache: ClassVar[Dict[str, str]] = {}
+    _summary_cache_size: ClassVar[int] = 256
+
     class Config:
         arbitrary_types_allowed = True
         extra = "allow"  # Allow extra fields for flexibility in subclasses
@@ -53,6 +75,14 @@ class BaseAgent(BaseModel, ABC):
             self.llm = LLM(config_name=self.name.lower())
         if not isinstance(self.memory, Memory):
             self.memory = Memory()
+        max_input_tokens = getattr(self.llm, "max_input_tokens", None)
+        if self.memory.max_tokens is None:
+            self.memory.max_tokens = max_input_tokens
+        if self.compaction_threshold is None:
+            self.compaction_threshold = getattr(self.llm, "compaction_threshold", None)
+        if self.compaction_threshold is None and max_input_tokens:
+            # Summarize before the budget forces eviction
+            self.compaction_threshold = max_input_tokens * 3 // 4
         return self
 
     @asynccontextmanager
@@ -130,29 +160,38 @@ class BaseAgent(BaseModel, ABC):
         if request:
             self.update_memory("user", request)
 
-        results: List[str] = []
-        async with self.state_context(AgentState.RUNNING):
-            while (
-                self.current_step < self.max_steps and self.state != AgentState.FINISHED
-            ):
-                # Check for cancellation
-                if cancel_event and cancel_event.is_set():
-                    return "操作已被取消"
-
-                self.current_step += 1
-                logger.info(f"Executing step {self.current_step}/{self.max_steps}")
-                step_result = await self.step()
-
-                # Check for stuck state
-                if self.is_stuck():
-                    self.handle_stuck_state()
-
-                results.append(f"Step {self.current_step}: {step_result}")
+        # Step results are kept by reference (usually the tool output already held
+        # in memory) and only formatted into the summary once, at the end
+        results: List[Tuple[int, str]] = []
+        try:
+            async with self.state_context(AgentState.RUNNING):
+                while (
+                    self.current_step < self.max_steps
+                    and self.state != AgentState.FINISHED
+                ):
+                    # Check for cancellation
+                    if cancel_event and cancel_event.is_set():
+                        return "操作已被取消"
+
+                    self.current_step += 1
+                    logger.info(f"Executing step {self.current_step}/{self.max_steps}")
+                    step_result = await self.step()
+
+                    # Check for stuck state
+                    if self.is_stuck():
+                        self.handle_stuck_state()
+
+                    self.maybe_compact_memory()
+
+                    results.append((self.current_step, step_result))
+        finally:
+            await self._stop_compaction()
 
-            if self.current_step >= self.max_steps:
-                results.append(f"Terminated: Reached max steps ({self.max_steps})")
+        summary = [f"Step {step}: {result}" for step, result in results]
+        if self.current_step >= self.max_steps:
+            summary.append(f"Terminated: Reached max steps ({self.max_steps})")
 
-        return "\n".join(results) if results else "No steps executed"
+        return "\n".join(summary) if summary else "No steps executed"
 
     @abstractmethod
     async def step(self) -> str:
@@ -161,30 +200,97 @@ class BaseAgent(BaseModel, ABC):
         Must be implemented by subclasses to define specific behavior.
         """
 
+    def maybe_compact_memory(self) -> None:
+        """Start summarizing older turns in the background if history is too large."""
+        if not self.compaction_threshold:
+            return
+        if self.memory.total_tokens <= self.compaction_threshold:
+            return
+        if self._compaction_task and not self._compaction_task.done():
+            return
+
+        prefix = self.memory.compactable_prefix(self.compaction_keep_messages)
+        if len(prefix) < 2:
+            return
+        self._compaction_task = asyncio.create_task(
+            self._compact_memory(prefix, self.memory.mark(len(prefix)))
+        )
+
+    async def _stop_compaction(self) -> None:
+        """Cancel a summary still in flight when the run ends."""
+        task, self._compaction_task = self._compaction_task, None
+        if task and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _compact_memory(
+        self, prefix: List[Message], end: Tuple[int, int]
+    ) -> None:
+        """Replace the history up to `end` with an LLM-written summary of `prefix`."""
+        try:
+            summary = await self._summarize(prefix)
+        except Exception as e:
+            logger.warning(f"Memory compaction failed: {e}")
+            return
+
+        before = self.memory.total_tokens
+        summary_msg = Message.user_message(SUMMARY_MESSAGE.format(summary=summary))
+        if self.memory.replace_prefix(end, summary_msg):
+            logger.info(
+                f"🗜️ Compacted {len(prefix)} messages into a summary "
+                f"(~{before} -> ~{self.memory.total_tokens} tokens)"
+            )
+
+    async def _summarize(self, messages: List[Message]) -> str:
+        """Summarize messages, reusing a cached summary of identical history."""
+        dicts = [msg.to_dict() for msg in messages]
+        key = hashlib.sha256(
+            json.dumps(dicts, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        if key in self._summary_cache:
+            return self._summary_cache[key]
+
+        lines = []
+        for msg in dicts:
+            content = msg.get("content") or ""
+            if len(content) > 2000:
+                content = content[:2000] + "..."
+            for call in msg.get("tool_calls") or []:
+                function = call["function"]
+                content += SUMMARY_TOOL_CALL.format(
+                    name=function["name"], arguments=function["arguments"][:500]
+                )
+            lines.append(f"{msg['role']}: {content}")
+
+        prompt = SUMMARY_PROMPT.format(history="\n".join(lines))
+        summary = await self.llm.ask(
+            messages=[Message.user_message(prompt)],
+            system_msgs=[Message.system_message(SYSTEM_PROMPT)],
+            stream=False,
+        )
+
+        if len(self._summary_cache) >= self._summary_cache_size:
+            self._summary_cache.pop(next(iter(self._summary_cache)))
+        self._summary_cache[key] = summary
+        return summary
+
     def handle_stuck_state(self):
         """Handle stuck state by adding a prompt to change strategy"""
         stuck_prompt = "\
         Observed duplicate responses. Consider new strategies and avoid repeating ineffective paths already attempted."
+        if stuck_prompt in self.next_step_prompt:
+            logger.warning("Agent is still stuck")
+            return
         self.next_step_prompt = f"{stuck_prompt}\n{self.next_step_prompt}"
         logger.warning(f"Agent detected stuck state. Added prompt: {stuck_prompt}")
 
     def is_stuck(self) -> bool:
-        """Check if the agent is stuck in a loop by detecting duplicate content"""
-        if len(self.memory.messages) < 2:
-            return False
-
-        last_message = self.memory.messages[-1]
-        if not last_message.content:
-            return False
-
-        # Count identical content occurrences
-        duplicate_count = sum(
-            1
-            for msg in reversed(self.memory.messages[:-1])
-            if msg.role == "assistant" and msg.content == last_message.content
-        )
+        """Check if the agent is stuck in a loop by detecting repeated turns
 
-        return duplicate_count >= self.duplicate_threshold
+        The agent is stuck when its latest turn repeats the turns right before
+        it: the same text, or the same tools called with the same arguments.
+        """
+        return self.memory.repeat_count() >= self.duplicate_threshold
 
     @property
     def messages(self) -> List[Message]:
@@ -194,4 +300,4 @@ class BaseAgent(BaseModel, ABC):
     @messages.setter
     def messages(self, value: List[Message]):
         """Set the list of messages in the agent's memory."""
-        self.memory.messages = value
+        self.memory.set_messages(value)
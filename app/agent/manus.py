@@ -7,10 +7,12 @@ from app.tool.browser_use_tool import BrowserUseTool
 from app.tool.file_saver import FileSaver
 from app.tool.google_search import GoogleSearch
 from app.tool.python_execute import PythonExecute
+from app.tool.web_fetch import WebFetch
 
 from app.tool.baidu_search import BaiduSearch
 
 from app.tool.bing_search import BingSearch
+from app.tool.meta_search import SEARCH_ENGINES, MetaSearch
 from app.config import config
 
 def get_search_agent():
@@ -24,6 +26,13 @@ def get_search_agent():
     #    search_agent = BingSearch()
     if search_agent_config == "google":
         search_agent = GoogleSearch()
+    # 并发查询多个搜索引擎并合并去重结果
+    if search_agent_config == "meta":
+        settings = config.llm["default"]
+        search_agent = MetaSearch(
+            engines=[SEARCH_ENGINES[name]() for name in settings.search_engines],
+            deadline=settings.search_deadline,
+        )
     return search_agent
 
 class Manus(ToolCallAgent):
@@ -46,6 +55,11 @@ class Manus(ToolCallAgent):
     # Add general-purpose tools to the tool collection
     available_tools: ToolCollection = Field(
         default_factory=lambda: ToolCollection(
-            PythonExecute(), get_search_agent(), BrowserUseTool(), FileSaver(), Terminate()
+            PythonExecute(),
+            get_search_agent(),
+            WebFetch(),
+            BrowserUseTool(),
+            FileSaver(),
+            Terminate(),
         )
     )
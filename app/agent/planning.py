@@ -56,7 +56,7 @@ class PlanningAgent(ToolCallAgent):
             if self.active_plan_id
             else self.next_step_prompt
         )
-        self.messages.append(Message.user_message(prompt))
+        self.memory.add_message(Message.user_message(prompt))
 
         # Get the current step index before thinking
         self.current_step_index = await self._get_current_step_index()
@@ -1,13 +1,17 @@
+import asyncio
 import json
-from typing import Any, List, Literal
+import time
+from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import Field
+from pydantic import Field, PrivateAttr, model_validator
 
 from app.agent.react import ReActAgent
 from app.logger import logger
 from app.prompt.toolcall import NEXT_STEP_PROMPT, SYSTEM_PROMPT
 from app.schema import AgentState, Message, ToolCall
 from app.tool import CreateChatCompletion, Terminate, ToolCollection
+from app.tool.base import EXCLUSIVE
+from app.tool.output_capture import PROGRESS_CHARS, PROGRESS_INTERVAL, output_progress
 
 
 TOOL_CALL_REQUIRED = "Tool calls required but none provided"
@@ -30,17 +34,39 @@ class ToolCallAgent(ReActAgent):
 
     tool_calls: List[ToolCall] = Field(default_factory=list)
 
+    # Stream the assistant message and hand over tool calls as soon as they parse
+    # (None: the LLM config's `stream_tool_calls`)
+    stream_tool_calls: Optional[bool] = None
+    # Start speculative-safe tool calls while the model is still generating
+    # (needs streaming; None: the LLM config's `speculative_tool_dispatch`)
+    speculative_tool_dispatch: Optional[bool] = None
+    # Upper bound on tool calls from one reply that run at the same time
+    max_concurrent_tools: int = 4
+
+    _speculative_tasks: Dict[str, asyncio.Task] = PrivateAttr(default_factory=dict)
+    _speculation_open: bool = PrivateAttr(default=False)
+
     max_steps: int = 30
 
+    @model_validator(mode="after")
+    def initialize_streaming(self) -> "ToolCallAgent":
+        """Take the streaming settings from the LLM config unless set here."""
+        if self.stream_tool_calls is None:
+            self.stream_tool_calls = getattr(self.llm, "stream_tool_calls", False)
+        if self.speculative_tool_dispatch is None:
+            self.speculative_tool_dispatch = getattr(
+                self.llm, "speculative_tool_dispatch", False
+            )
+        return self
+
     async def think(self) -> bool:
         """Process current state and decide next actions using tools"""
         if self.next_step_prompt:
             user_msg = Message.user_message(self.next_step_prompt)
-            self.messages += [user_msg]
+            self.memory.add_message(user_msg)
 
         # Get response with tool options
-        response = await self.llm.ask_tool(
-            messages=self.messages,
+        response = await self._ask_tool(
             system_msgs=[Message.system_message(self.system_prompt)]
             if self.system_prompt
             else None,
@@ -62,6 +88,7 @@ class ToolCallAgent(ReActAgent):
         try:
             # Handle different tool_choices modes
             if self.tool_choices == "none":
+                self._cancel_speculative_tasks()
                 if response.tool_calls:
                     logger.warning(
                         f"🤔 Hmm, {self.name} tried to use tools when they weren't available!"
@@ -98,6 +125,72 @@ class ToolCallAgent(ReActAgent):
             )
             return False
 
+    async def _ask_tool(self, **kwargs):
+        """Request the next assistant message, streaming it if enabled."""
+        self._cancel_speculative_tasks()
+        if not self.stream_tool_calls:
+            return await self.llm.ask_tool(messages=self.messages, **kwargs)
+
+        response = None
+        # Speculation is only sound for a leading run of safe calls: anything
+        # after an unsafe call may depend on its side effects
+        self._speculation_open = self.speculative_tool_dispatch
+        # The complete reply is logged by think(); while it streams, recent text
+        # goes to the session's progress channel (the web UI), if there is one
+        progress = output_progress.get()
+        content = ""
+        last_progress = time.monotonic()
+        try:
+            async for event in self.llm.ask_tool_stream(
+                messages=self.messages, **kwargs
+            ):
+                if event.type == "content":
+                    content += event.content
+                    now = time.monotonic()
+                    if progress and now - last_progress >= PROGRESS_INTERVAL:
+                        progress(self.name, content[-PROGRESS_CHARS:])
+                        last_progress = now
+                elif event.type == "tool_call":
+                    await self._on_tool_call_ready(event.tool_call)
+                elif event.type == "done":
+                    response = event.message
+        except BaseException:
+            self._cancel_speculative_tasks()
+            raise
+        return response
+
+    async def _on_tool_call_ready(self, command: ToolCall) -> None:
+        """Called during streaming as soon as a tool call is fully parsed."""
+        logger.info(f"🧩 Tool call ready: {command.function.name}")
+        if not self._speculation_open:
+            return
+        if not self._can_speculate(command):
+            self._speculation_open = False
+            return
+
+        logger.info(f"⚡ Speculatively starting tool '{command.function.name}'")
+        self._speculative_tasks[command.id] = asyncio.create_task(
+            self.execute_tool(command)
+        )
+
+    def _can_speculate(self, command: ToolCall) -> bool:
+        """Check whether a tool call may start before the reply is complete."""
+        name = command.function.name
+        tool = self.available_tools.get_tool(name)
+        if tool is None or self._is_special_tool(name):
+            return False
+        try:
+            args = json.loads(command.function.arguments or "{}")
+        except json.JSONDecodeError:
+            return False
+        return isinstance(args, dict) and tool.can_speculate(**args)
+
+    def _cancel_speculative_tasks(self) -> None:
+        """Drop speculative results that will not be used."""
+        for task in self._speculative_tasks.values():
+            task.cancel()
+        self._speculative_tasks = {}
+
     async def act(self) -> str:
         """Execute tool calls and handle their results"""
         if not self.tool_calls:
@@ -107,22 +200,93 @@ class ToolCallAgent(ReActAgent):
             # Return last message content if no tool calls
             return self.messages[-1].content or "No content or commands to execute"
 
-        results = []
-        for command in self.tool_calls:
-            result = await self.execute_tool(command)
+        results = await self._run_tool_calls(self.tool_calls)
+        for command, result in zip(self.tool_calls, results):
             logger.info(
                 f"🎯 Tool '{command.function.name}' completed its mission! Result: {result}"
             )
 
-            # Add tool response to memory
+            # Add tool responses to memory in the original call order
             tool_msg = Message.tool_message(
                 content=result, tool_call_id=command.id, name=command.function.name
             )
             self.memory.add_message(tool_msg)
-            results.append(result)
 
         return "\n\n".join(results)
 
+    async def _run_tool_calls(self, commands: List[ToolCall]) -> List[str]:
+        """Run tool calls concurrently where safe, returning results in call order.
+
+        Concurrency-safe calls run alongside anything. A call with a resource
+        key waits for earlier calls with the same key, and an exclusive call
+        (the default for tools that are not concurrency-safe) waits for every
+        earlier call and holds back every later one. Special tools (e.g.
+        `terminate`) run last, after everything else.
+        """
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrent_tools))
+
+        async def run(command: ToolCall, after: List[asyncio.Task]) -> str:
+            # Wait for the calls this one depends on before taking a slot, so a
+            # waiting call never holds one
+            if after:
+                await asyncio.wait(after)
+            async with semaphore:
+                return await self._run_tool_call(command)
+
+        tasks: Dict[int, asyncio.Task] = {}
+        exclusive: Optional[asyncio.Task] = None  # latest exclusive call
+        last_by_key: Dict[str, asyncio.Task] = {}
+        for i, command in enumerate(commands):
+            if self._is_special_tool(command.function.name):
+                continue
+            key = self._concurrency_key(command)
+            if key == EXCLUSIVE:
+                after = list(tasks.values())
+            else:
+                after = [
+                    task
+                    for task in (exclusive, last_by_key.get(key))
+                    if task is not None
+                ]
+            task = asyncio.create_task(run(command, after))
+            tasks[i] = task
+            if key == EXCLUSIVE:
+                exclusive = task
+            elif key is not None:
+                last_by_key[key] = task
+
+        try:
+            outputs = await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        results: Dict[int, str] = dict(zip(tasks, outputs))
+
+        for i, command in enumerate(commands):
+            if i not in results:
+                results[i] = await self._run_tool_call(command)
+
+        return [results[i] for i in range(len(commands))]
+
+    def _concurrency_key(self, command: ToolCall) -> Optional[str]:
+        """Resource key a tool call must hold exclusively, if any."""
+        tool = self.available_tools.get_tool(command.function.name)
+        if tool is None:
+            return None
+        try:
+            args = json.loads(command.function.arguments or "{}")
+        except json.JSONDecodeError:
+            return None
+        return tool.concurrency_key(**args) if isinstance(args, dict) else EXCLUSIVE
+
+    async def _run_tool_call(self, command: ToolCall) -> str:
+        """Execute a tool call, reusing its speculative run if one was started."""
+        task = self._speculative_tasks.pop(command.id, None)
+        if task is not None:
+            return await task
+        return await self.execute_tool(command)
+
     async def execute_tool(self, command: ToolCall) -> str:
         """Execute a single tool call with robust error handling"""
         if not command or not command.function or not command.function.name:
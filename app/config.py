@@ -1,7 +1,7 @@
 import threading
 import tomllib
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -20,10 +20,61 @@ class LLMSettings(BaseModel):
     base_url: str = Field(..., description="API base URL")
     api_key: str = Field(..., description="API key")
     max_tokens: int = Field(4096, description="Maximum number of tokens per request")
+    max_input_tokens: Optional[int] = Field(
+        None, description="Token budget for the conversation history sent per request"
+    )
+    compaction_threshold: Optional[int] = Field(
+        None,
+        description="History size (tokens) at which older turns are summarized, "
+        "defaults to 3/4 of max_input_tokens, 0 disables",
+    )
     temperature: float = Field(1.0, description="Sampling temperature")
+    stream_tool_calls: bool = Field(
+        False, description="Stream replies and start tool calls as they parse"
+    )
+    speculative_tool_dispatch: bool = Field(
+        False,
+        description="With streaming, start read-only tool calls before the reply ends",
+    )
     api_type: str = Field(..., description="AzureOpenai or Openai")
     api_version: str = Field(..., description="Azure Openai version if AzureOpenai")
     search_agent_config: str = Field(..., description="Search agent used search url")
+    search_engines: List[str] = Field(
+        ["bing", "baidu", "google"],
+        description="Engines queried by meta search (search_agent_config = meta)",
+    )
+    search_deadline: float = Field(
+        5.0, description="Seconds meta search waits for slow engines"
+    )
+    browser_headless: bool = Field(True, description="Run the shared browser headless")
+    browser_pool_size: int = Field(2, description="Browser contexts kept warm")
+    browser_max_pages: int = Field(
+        100, description="Navigations before a browser context is replaced"
+    )
+    cache_enabled: bool = Field(False, description="Cache identical LLM requests")
+    cache_path: str = Field(
+        str(PROJECT_ROOT / ".cache" / "llm_responses.sqlite3"),
+        description="SQLite file for the on-disk response cache, empty for memory only",
+    )
+    cache_max_entries: int = Field(512, description="In-memory cache entry limit")
+    cache_disk_max_entries: int = Field(10000, description="On-disk cache entry limit")
+    cache_ttl: float = Field(
+        86400.0, description="Cache entry lifetime in seconds, 0 disables expiry"
+    )
+    max_concurrency: int = Field(0, description="Max in-flight requests, 0 = unlimited")
+    requests_per_minute: int = Field(0, description="Request rate limit, 0 = unlimited")
+    tokens_per_minute: int = Field(0, description="Token rate limit, 0 = unlimited")
+    endpoints: List[str] = Field(
+        default_factory=list,
+        description="Base URLs to load-balance across, defaults to [base_url]",
+    )
+    endpoint_failure_threshold: int = Field(
+        3, description="Consecutive failures before an endpoint is ejected"
+    )
+    endpoint_cooldown: float = Field(
+        30.0, description="Seconds an ejected endpoint is kept out of rotation"
+    )
+
 
 class AppConfig(BaseModel):
     llm: Dict[str, LLMSettings]
@@ -77,17 +128,43 @@ class Config:
             "base_url": base_llm.get("base_url"),
             "api_key": base_llm.get("api_key"),
             "max_tokens": base_llm.get("max_tokens", 4096),
+            "max_input_tokens": base_llm.get("max_input_tokens"),
+            "compaction_threshold": base_llm.get("compaction_threshold"),
             "temperature": base_llm.get("temperature", 1.0),
+            "stream_tool_calls": base_llm.get("stream_tool_calls", False),
+            "speculative_tool_dispatch": base_llm.get(
+                "speculative_tool_dispatch", False
+            ),
             "api_type": base_llm.get("api_type", ""),
             "api_version": base_llm.get("api_version", ""),
             "search_agent_config": base_llm.get("search_agent_config", "baidu"),
+            "search_engines": base_llm.get(
+                "search_engines", ["bing", "baidu", "google"]
+            ),
+            "search_deadline": base_llm.get("search_deadline", 5.0),
+            "browser_headless": base_llm.get("browser_headless", True),
+            "browser_pool_size": base_llm.get("browser_pool_size", 2),
+            "browser_max_pages": base_llm.get("browser_max_pages", 100),
+            "cache_enabled": base_llm.get("cache_enabled", False),
+            "cache_path": base_llm.get(
+                "cache_path", str(PROJECT_ROOT / ".cache" / "llm_responses.sqlite3")
+            ),
+            "cache_max_entries": base_llm.get("cache_max_entries", 512),
+            "cache_disk_max_entries": base_llm.get("cache_disk_max_entries", 10000),
+            "cache_ttl": base_llm.get("cache_ttl", 86400.0),
+            "max_concurrency": base_llm.get("max_concurrency", 0),
+            "requests_per_minute": base_llm.get("requests_per_minute", 0),
+            "tokens_per_minute": base_llm.get("tokens_per_minute", 0),
+            "endpoints": base_llm.get("endpoints", []),
+            "endpoint_failure_threshold": base_llm.get("endpoint_failure_threshold", 3),
+            "endpoint_cooldown": base_llm.get("endpoint_cooldown", 30.0),
         }
 
         config_dict = {
             "llm": {
                 "default": default_settings,
                 **{
-                    name: {**default_settings, **override_config}
+                    name: self._merge_override(default_settings, override_config)
                     for name, override_config in llm_overrides.items()
                 },
             }
@@ -95,6 +172,14 @@ class Config:
 
         self._config = AppConfig(**config_dict)
 
+    @staticmethod
+    def _merge_override(default_settings: dict, override_config: dict) -> dict:
+        settings = {**default_settings, **override_config}
+        # The default endpoints serve the default base_url, not an override's own
+        if "base_url" in override_config and "endpoints" not in override_config:
+            settings["endpoints"] = []
+        return settings
+
     @property
     def llm(self) -> Dict[str, LLMSettings]:
         return self._config.llm
@@ -80,32 +80,34 @@ class PlanningFlow(BaseFlow):
                     )
                     return f"Failed to create plan for: {input_text}"
 
-            result = ""
+            # Collect step outputs and join once instead of re-copying the
+            # accumulated result on every step
+            results: List[str] = []
             while True:
                 # 检查是否被要求取消执行
                 if cancel_event and cancel_event.is_set():
                     logger.warning("Execution cancelled by user")
-                    return result + "\n执行已被用户取消"
+                    return "".join(results) + "\n执行已被用户取消"
 
                 # Get current step to execute
                 self.current_step_index, step_info = await self._get_current_step_info()
 
                 # Exit if no more steps or plan completed
                 if self.current_step_index is None:
-                    result += await self._finalize_plan()
+                    results.append(await self._finalize_plan())
                     break
 
                 # Execute current step with appropriate agent
                 step_type = step_info.get("type") if step_info else None
                 executor = self.get_executor(step_type)
                 step_result = await self._execute_step(executor, step_info)
-                result += step_result + "\n"
+                results.extend((step_result, "\n"))
 
                 # Check if agent wants to terminate
                 if hasattr(executor, "state") and executor.state == AgentState.FINISHED:
                     break
 
-            return result
+            return "".join(results)
         except Exception as e:
             logger.error(f"Error in PlanningFlow: {str(e)}")
             return f"Execution failed: {str(e)}"
@@ -1,4 +1,5 @@
-from typing import Dict, List, Literal, Optional, Union
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Dict, List, Literal, Optional, Union
 
 from openai import (
     APIError,
@@ -9,10 +10,20 @@ from openai import (
     RateLimitError,
     AsyncAzureOpenAI
 )
-from tenacity import retry, stop_after_attempt, wait_random_exponential
+from openai.types.chat import ChatCompletionMessage
+from tenacity import (
+    AsyncRetrying,
+    retry,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
 from app.config import LLMSettings, config
+from app.llm_cache import LLMCache
+from app.llm_pool import Endpoint, EndpointPool
+from app.llm_stream import StreamEvent, ToolCallAssembler
 from app.logger import logger  # Assuming a logger is set up in your app
+from app.rate_limiter import AdmissionController, retry_after_seconds
 from app.schema import Message
 
 
@@ -36,19 +47,40 @@ class LLM:
             llm_config = llm_config.get(config_name, llm_config["default"])
             self.model = llm_config.model
             self.max_tokens = llm_config.max_tokens
+            self.max_input_tokens = llm_config.max_input_tokens
+            self.compaction_threshold = llm_config.compaction_threshold
+            self.stream_tool_calls = llm_config.stream_tool_calls
+            self.speculative_tool_dispatch = llm_config.speculative_tool_dispatch
             self.temperature = llm_config.temperature
             self.api_type = llm_config.api_type
             self.api_key = llm_config.api_key
             self.api_version = llm_config.api_version
             self.base_url = llm_config.base_url
-            if self.api_type == "azure":
-                self.client = AsyncAzureOpenAI(
-                    base_url=self.base_url,
-                    api_key=self.api_key,
-                    api_version=self.api_version,
+            self.pool = EndpointPool(
+                [
+                    Endpoint(base_url, self._create_client(base_url))
+                    for base_url in llm_config.endpoints or [self.base_url]
+                ],
+                failure_threshold=llm_config.endpoint_failure_threshold,
+                cooldown=llm_config.endpoint_cooldown,
+            )
+            self.client = self.pool.endpoints[0].client
+            self.cache = (
+                LLMCache(
+                    path=llm_config.cache_path or None,
+                    max_entries=llm_config.cache_max_entries,
+                    disk_max_entries=llm_config.cache_disk_max_entries,
+                    ttl=llm_config.cache_ttl,
                 )
-            else:
-                self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+                if llm_config.cache_enabled
+                else None
+            )
+            self.limiter = AdmissionController.for_config(
+                config_name,
+                max_concurrency=llm_config.max_concurrency,
+                requests_per_minute=llm_config.requests_per_minute,
+                tokens_per_minute=llm_config.tokens_per_minute,
+            )
 
     @staticmethod
     def format_messages(messages: List[Union[dict, Message]]) -> List[dict]:
@@ -82,7 +114,7 @@ class LLM:
                     raise ValueError("Message dict must contain 'role' field")
                 formatted_messages.append(message)
             elif isinstance(message, Message):
-                # If message is a Message object, convert it to dict
+                # Message objects cache their dict, so this is cheap on every step
                 formatted_messages.append(message.to_dict())
             else:
                 raise TypeError(f"Unsupported message type: {type(message)}")
@@ -98,6 +130,36 @@ class LLM:
 
         return formatted_messages
 
+    def _create_client(self, base_url: str):
+        """Create an API client for one endpoint."""
+        if self.api_type == "azure":
+            return AsyncAzureOpenAI(
+                base_url=base_url,
+                api_key=self.api_key,
+                api_version=self.api_version,
+            )
+        return AsyncOpenAI(api_key=self.api_key, base_url=base_url)
+
+    def _estimate_tokens(self, messages: List[dict]) -> int:
+        """Roughly estimate the tokens a request reserves (prompt + completion)."""
+        chars = sum(len(str(msg.get("content") or "")) for msg in messages)
+        chars += sum(len(str(msg.get("tool_calls") or "")) for msg in messages)
+        return chars // 4 + self.max_tokens
+
+    def _handle_rate_limit(self, error: Exception) -> None:
+        """Pause admissions for as long as the server asked us to back off."""
+        retry_after = retry_after_seconds(error)
+        if retry_after:
+            self.limiter.pause(retry_after)
+
+    def _cache_key(self, kind: str, messages: List[dict], **params) -> Optional[str]:
+        """Build the response cache key for a request, or None if caching is off."""
+        if self.cache is None:
+            return None
+        return LLMCache.make_key(
+            kind=kind, model=self.model, messages=messages, **params
+        )
+
     @retry(
         wait=wait_random_exponential(min=1, max=60),
         stop=stop_after_attempt(6),
@@ -134,44 +196,66 @@ class LLM:
             else:
                 messages = self.format_messages(messages)
 
-            if not stream:
-                # Non-streaming request
-                response = await self.client.chat.completions.create(
+            cache_key = self._cache_key(
+                "ask",
+                messages,
+                max_tokens=self.max_tokens,
+                temperature=temperature or self.temperature,
+            )
+            if cache_key and (cached := await self.cache.aget(cache_key)) is not None:
+                logger.debug(f"LLM cache hit for ask ({cache_key[:12]})")
+                return cached
+
+            async with self.limiter.admit(
+                self._estimate_tokens(messages)
+            ), self.pool.lease() as lease:
+                if not stream:
+                    # Non-streaming request
+                    response = await lease.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=self.max_tokens,
+                        temperature=temperature or self.temperature,
+                        stream=False,
+                    )
+                    if not response.choices or not response.choices[0].message.content:
+                        raise ValueError("Empty or invalid response from LLM")
+                    if cache_key:
+                        await self.cache.aset(
+                            cache_key, response.choices[0].message.content
+                        )
+                    return response.choices[0].message.content
+
+                # Streaming request
+                response = await lease.client.chat.completions.create(
                     model=self.model,
                     messages=messages,
                     max_tokens=self.max_tokens,
                     temperature=temperature or self.temperature,
-                    stream=False,
+                    stream=True,
                 )
-                if not response.choices or not response.choices[0].message.content:
-                    raise ValueError("Empty or invalid response from LLM")
-                return response.choices[0].message.content
-
-            # Streaming request
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=self.max_tokens,
-                temperature=temperature or self.temperature,
-                stream=True,
-            )
-
-            collected_messages = []
-            async for chunk in response:
-                chunk_message = chunk.choices[0].delta.content or ""
-                collected_messages.append(chunk_message)
-                print(chunk_message, end="", flush=True)
-
-            print()  # Newline after streaming
-            full_response = "".join(collected_messages).strip()
-            if not full_response:
-                raise ValueError("Empty response from streaming LLM")
-            return full_response
+                lease.responded()
+
+                collected_messages = []
+                async for chunk in response:
+                    chunk_message = chunk.choices[0].delta.content or ""
+                    collected_messages.append(chunk_message)
+                    print(chunk_message, end="", flush=True)
+
+                print()  # Newline after streaming
+                full_response = "".join(collected_messages).strip()
+                if not full_response:
+                    raise ValueError("Empty response from streaming LLM")
+                if cache_key:
+                    await self.cache.aset(cache_key, full_response)
+                return full_response
 
         except ValueError as ve:
             logger.error(f"Validation error: {ve}")
             raise
         except OpenAIError as oe:
+            if isinstance(oe, RateLimitError):
+                self._handle_rate_limit(oe)
             logger.error(f"OpenAI API error: {oe}")
             raise
         except Exception as e:
@@ -230,23 +314,43 @@ class LLM:
                     if not isinstance(tool, dict) or "type" not in tool:
                         raise ValueError("Each tool must be a dict with 'type' field")
 
-            # Set up the completion request
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature or self.temperature,
+            cache_key = self._cache_key(
+                "ask_tool",
+                messages,
                 max_tokens=self.max_tokens,
+                temperature=temperature or self.temperature,
                 tools=tools,
                 tool_choice=tool_choice,
-                timeout=timeout,
                 **kwargs,
             )
+            if cache_key and (cached := await self.cache.aget(cache_key)) is not None:
+                logger.debug(f"LLM cache hit for ask_tool ({cache_key[:12]})")
+                return ChatCompletionMessage.model_validate_json(cached)
+
+            # Set up the completion request
+            async with self.limiter.admit(
+                self._estimate_tokens(messages)
+            ), self.pool.lease() as lease:
+                response = await lease.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature or self.temperature,
+                    max_tokens=self.max_tokens,
+                    tools=tools,
+                    tool_choice=tool_choice,
+                    timeout=timeout,
+                    **kwargs,
+                )
 
             # Check if response is valid
             if not response.choices or not response.choices[0].message:
                 print(response)
                 raise ValueError("Invalid or empty response from LLM")
 
+            if cache_key:
+                await self.cache.aset(
+                    cache_key, response.choices[0].message.model_dump_json()
+                )
             return response.choices[0].message
 
         except ValueError as ve:
@@ -256,6 +360,7 @@ class LLM:
             if isinstance(oe, AuthenticationError):
                 logger.error("Authentication failed. Check API key.")
             elif isinstance(oe, RateLimitError):
+                self._handle_rate_limit(oe)
                 logger.error("Rate limit exceeded. Consider increasing retry attempts.")
             elif isinstance(oe, APIError):
                 logger.error(f"API error: {oe}")
@@ -263,3 +368,151 @@ class LLM:
         except Exception as e:
             logger.error(f"Unexpected error in ask_tool: {e}")
             raise
+
+    async def ask_tool_stream(
+        self,
+        messages: List[Union[dict, Message]],
+        system_msgs: Optional[List[Union[dict, Message]]] = None,
+        timeout: int = 60,
+        tools: Optional[List[dict]] = None,
+        tool_choice: Literal["none", "auto", "required"] = "auto",
+        temperature: Optional[float] = None,
+        **kwargs,
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        Streaming variant of `ask_tool`.
+
+        Yields content deltas as they arrive and each tool call as soon as its
+        arguments are complete, followed by a final `done` event carrying the
+        assembled ChatCompletionMessage (the same object `ask_tool` returns).
+
+        Args:
+            messages: List of conversation messages
+            system_msgs: Optional system messages to prepend
+            timeout: Request timeout in seconds
+            tools: List of tools to use
+            tool_choice: Tool choice strategy
+            temperature: Sampling temperature for the response
+            **kwargs: Additional completion arguments
+
+        Yields:
+            StreamEvent: `content`, `tool_call` and finally `done` events
+
+        Raises:
+            ValueError: If tools, tool_choice, or messages are invalid
+            OpenAIError: If the API call fails (retried like `ask_tool` until the
+                first chunk arrives, not once the stream is under way)
+        """
+        try:
+            if tool_choice not in ["none", "auto", "required"]:
+                raise ValueError(f"Invalid tool_choice: {tool_choice}")
+
+            if system_msgs:
+                system_msgs = self.format_messages(system_msgs)
+                messages = system_msgs + self.format_messages(messages)
+            else:
+                messages = self.format_messages(messages)
+
+            if tools:
+                for tool in tools:
+                    if not isinstance(tool, dict) or "type" not in tool:
+                        raise ValueError("Each tool must be a dict with 'type' field")
+
+            cache_key = self._cache_key(
+                "ask_tool",
+                messages,
+                max_tokens=self.max_tokens,
+                temperature=temperature or self.temperature,
+                tools=tools,
+                tool_choice=tool_choice,
+                **kwargs,
+            )
+            if cache_key and (cached := await self.cache.aget(cache_key)) is not None:
+                logger.debug(f"LLM cache hit for ask_tool ({cache_key[:12]})")
+                message = ChatCompletionMessage.model_validate_json(cached)
+                if message.content:
+                    yield StreamEvent(type="content", content=message.content)
+                for tool_call in message.tool_calls or []:
+                    yield StreamEvent(type="tool_call", tool_call=tool_call)
+                yield StreamEvent(type="done", message=message)
+                return
+
+            assembler = ToolCallAssembler()
+            content_parts = []
+            async with self._open_stream(
+                messages=messages,
+                temperature=temperature or self.temperature,
+                max_tokens=self.max_tokens,
+                tools=tools,
+                tool_choice=tool_choice,
+                timeout=timeout,
+                **kwargs,
+            ) as response:
+                async for chunk in response:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    if delta.content:
+                        content_parts.append(delta.content)
+                        yield StreamEvent(type="content", content=delta.content)
+                    if delta.tool_calls:
+                        for tool_call in assembler.feed(delta.tool_calls):
+                            yield StreamEvent(type="tool_call", tool_call=tool_call)
+
+            for tool_call in assembler.finish():
+                yield StreamEvent(type="tool_call", tool_call=tool_call)
+
+            message = ChatCompletionMessage(
+                role="assistant",
+                content="".join(content_parts) or None,
+                tool_calls=assembler.tool_calls() or None,
+            )
+            if cache_key:
+                await self.cache.aset(cache_key, message.model_dump_json())
+            yield StreamEvent(type="done", message=message)
+
+        except ValueError as ve:
+            logger.error(f"Validation error in ask_tool_stream: {ve}")
+            raise
+        except OpenAIError as oe:
+            # Rate limits were already handled while opening the stream
+            logger.error(f"OpenAI API error in ask_tool_stream: {oe}")
+            raise
+
+    @asynccontextmanager
+    async def _open_stream(self, messages: List[dict], **params):
+        """Start a streaming completion, retrying like `ask_tool` until the first
+        chunk arrives. Yields the chunks, holding the admission slot and the
+        endpoint lease until the caller is done with them."""
+        async for attempt in AsyncRetrying(
+            wait=wait_random_exponential(min=1, max=60),
+            stop=stop_after_attempt(6),
+            reraise=True,
+        ):
+            with attempt:
+                stack = AsyncExitStack()
+                try:
+                    await stack.enter_async_context(
+                        self.limiter.admit(self._estimate_tokens(messages))
+                    )
+                    lease = await stack.enter_async_context(self.pool.lease())
+                    response = await lease.client.chat.completions.create(
+                        model=self.model, messages=messages, stream=True, **params
+                    )
+                    lease.responded()
+                    chunks = response.__aiter__()
+                    first = await anext(chunks, None)
+                except BaseException as e:
+                    if isinstance(e, RateLimitError):
+                        self._handle_rate_limit(e)
+                    await stack.__aexit__(type(e), e, e.__traceback__)
+                    raise
+
+        async def stream():
+            if first is not None:
+                yield first
+            async for chunk in chunks:
+                yield chunk
+
+        async with stack:
+            yield stream()
@@ -0,0 +1,220 @@
+"""Content-addressed cache for LLM responses."""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from app.logger import logger
+
+
+class LLMCache:
+    """Two-tier response cache: an in-memory LRU backed by an SQLite file.
+
+    Entries are keyed by a stable hash of everything that determines the model
+    output (model, messages, tools, tool_choice, temperature, ...), so identical
+    requests can be answered without calling the API. Async callers use `aget`
+    and `aset`, which do the SQLite I/O in a worker thread.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_entries: int = 512,
+        disk_max_entries: int = 10000,
+        ttl: Optional[float] = 86400.0,
+    ):
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self.ttl = ttl or None
+        self.hits = 0
+        self.misses = 0
+
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()  # memory tier and counters
+        self._disk_lock = threading.Lock()  # the SQLite connection
+        self._conn: Optional[sqlite3.Connection] = None
+        if self.path:
+            self._open_disk_tier()
+
+    def _open_disk_tier(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+                "ON responses (accessed_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache disk tier disabled ({self.path}): {e}")
+            self._conn = None
+
+    @staticmethod
+    def make_key(**request: Any) -> str:
+        """Build a stable content hash for a request."""
+        payload = json.dumps(
+            request,
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for `key`, or None on a miss."""
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+        return self._disk_lookup(key, now)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """`get` that doesn't block the event loop on the disk tier."""
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+        if self._conn is None:
+            return self._disk_lookup(key, now)
+        return await asyncio.to_thread(self._disk_lookup, key, now)
+
+    def set(self, key: str, value: str) -> None:
+        """Store `value` under `key` in both tiers."""
+        now = time.time()
+        with self._lock:
+            self._memory_put(key, now, value)
+        self._disk_set(key, value, now)
+
+    async def aset(self, key: str, value: str) -> None:
+        """`set` that doesn't block the event loop on the disk tier."""
+        now = time.time()
+        with self._lock:
+            self._memory_put(key, now, value)
+        if self._conn is not None:
+            await asyncio.to_thread(self._disk_set, key, value, now)
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry[0], now):
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _disk_lookup(self, key: str, now: float) -> Optional[str]:
+        value = self._disk_get(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self._memory_put(key, value[0], value[1])
+            self.hits += 1
+            return value[1]
+
+    def _memory_put(self, key: str, created_at: float, value: str) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, str]]:
+        if self._conn is None:
+            return None
+        try:
+            with self._disk_lock:
+                row = self._conn.execute(
+                    "SELECT created_at, value FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if self._expired(row[0], now):
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    return None
+                self._conn.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                self._conn.commit()
+                return row[0], row[1]
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+
+    def _disk_set(self, key: str, value: str, now: float) -> None:
+        if self._conn is None:
+            return
+        try:
+            with self._disk_lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now),
+                )
+                if self.ttl is not None:
+                    self._conn.execute(
+                        "DELETE FROM responses WHERE created_at < ?",
+                        (now - self.ttl,),
+                    )
+                (count,) = self._conn.execute(
+                    "SELECT COUNT(*) FROM responses"
+                ).fetchone()
+                if count > self.disk_max_entries:
+                    self._conn.execute(
+                        "DELETE FROM responses WHERE key IN ("
+                        "SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                        (count - self.disk_max_entries,),
+                    )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers and reset the counters."""
+        with self._lock:
+            self._memory.clear()
+            self.hits = 0
+            self.misses = 0
+        if self._conn is not None:
+            with self._disk_lock:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier sizes."""
+        disk_entries = 0
+        if self._conn is not None:
+            with self._disk_lock:
+                (disk_entries,) = self._conn.execute(
+                    "SELECT COUNT(*) FROM responses"
+                ).fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
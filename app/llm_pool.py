@@ -0,0 +1,133 @@
+"""Latency-aware load balancing across several LLM endpoints."""
+
+import time
+from contextlib import asynccontextmanager
+from typing import Any, List, Optional
+
+from openai import APIConnectionError, InternalServerError
+
+from app.logger import logger
+
+
+# Errors that say something about the endpoint itself rather than the request
+ENDPOINT_ERRORS = (APIConnectionError, InternalServerError, TimeoutError)
+
+
+class Endpoint:
+    """One inference server and its health/latency statistics."""
+
+    def __init__(self, base_url: str, client: Any):
+        self.base_url = base_url
+        self.client = client
+        self.latency: Optional[float] = None  # EWMA of response latency, seconds
+        self.in_flight = 0
+        self.failures = 0  # consecutive failures
+        self.ejected_until = 0.0
+
+    def is_available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def score(self) -> float:
+        """Expected wait for a new request; lower is better."""
+        # Endpoints without measurements are tried first so every box gets probed;
+        # each recent failure counts as a second of extra latency
+        latency = self.latency if self.latency is not None else 0.0
+        return (latency + self.failures) * (self.in_flight + 1)
+
+
+class EndpointLease:
+    """A single request routed to an endpoint."""
+
+    def __init__(self, endpoint: Endpoint):
+        self.endpoint = endpoint
+        self.started = time.monotonic()
+        self.latency: Optional[float] = None
+
+    @property
+    def client(self) -> Any:
+        return self.endpoint.client
+
+    def responded(self) -> None:
+        """Record the response latency now (e.g. when a stream starts)."""
+        if self.latency is None:
+            self.latency = time.monotonic() - self.started
+
+
+class EndpointPool:
+    """Routes requests to the endpoint with the best EWMA latency and queue depth.
+
+    Endpoints that fail `failure_threshold` times in a row are ejected for
+    `cooldown` seconds and then probed again.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        alpha: float = 0.3,
+    ):
+        if not endpoints:
+            raise ValueError("EndpointPool requires at least one endpoint")
+        self.endpoints = endpoints
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.alpha = alpha
+
+    def pick(self) -> Endpoint:
+        """Choose the endpoint for the next request."""
+        now = time.monotonic()
+        available = [ep for ep in self.endpoints if ep.is_available(now)]
+        if not available:
+            # Everything is ejected: use the one that comes back soonest
+            return min(self.endpoints, key=lambda ep: ep.ejected_until)
+        return min(available, key=lambda ep: ep.score())
+
+    def record_success(self, endpoint: Endpoint, latency: float) -> None:
+        endpoint.failures = 0
+        endpoint.ejected_until = 0.0
+        if endpoint.latency is None:
+            endpoint.latency = latency
+        else:
+            endpoint.latency = (
+                self.alpha * latency + (1 - self.alpha) * endpoint.latency
+            )
+
+    def record_failure(self, endpoint: Endpoint, error: BaseException) -> None:
+        endpoint.failures += 1
+        if endpoint.failures >= self.failure_threshold:
+            endpoint.ejected_until = time.monotonic() + self.cooldown
+            logger.warning(
+                f"Ejecting LLM endpoint {endpoint.base_url} for {self.cooldown:.0f}s "
+                f"after {endpoint.failures} consecutive failures: {error}"
+            )
+
+    @asynccontextmanager
+    async def lease(self):
+        """Route one request, tracking queue depth, latency and failures."""
+        endpoint = self.pick()
+        lease = EndpointLease(endpoint)
+        endpoint.in_flight += 1
+        try:
+            yield lease
+        except ENDPOINT_ERRORS as e:
+            self.record_failure(endpoint, e)
+            raise
+        else:
+            lease.responded()
+            self.record_success(endpoint, lease.latency)
+        finally:
+            endpoint.in_flight -= 1
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "base_url": ep.base_url,
+                "latency": ep.latency,
+                "in_flight": ep.in_flight,
+                "failures": ep.failures,
+                "available": ep.is_available(now),
+            }
+            for ep in self.endpoints
+        ]
@@ -0,0 +1,90 @@
+"""Incremental assembly of streamed chat completions."""
+
+import json
+from typing import Dict, List, Literal, Optional
+
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall
+from pydantic import BaseModel
+
+
+class StreamEvent(BaseModel):
+    """An event produced while a tool-calling completion is streamed.
+
+    - `content`: a text delta of the assistant message
+    - `tool_call`: a tool call whose arguments are complete
+    - `done`: the fully assembled assistant message
+    """
+
+    type: Literal["content", "tool_call", "done"]
+    content: Optional[str] = None
+    tool_call: Optional[ChatCompletionMessageToolCall] = None
+    message: Optional[ChatCompletionMessage] = None
+
+
+class ToolCallAssembler:
+    """Rebuilds tool calls from streamed `delta.tool_calls` fragments.
+
+    A call is reported as ready as soon as its arguments form a complete JSON
+    document, or when the model moves on to the next call index.
+    """
+
+    def __init__(self):
+        self._calls: Dict[int, dict] = {}
+        self._ready: Dict[int, ChatCompletionMessageToolCall] = {}
+
+    def feed(self, deltas: List) -> List[ChatCompletionMessageToolCall]:
+        """Consume tool-call deltas from one chunk, return newly completed calls."""
+        for delta in deltas:
+            call = self._calls.setdefault(
+                delta.index, {"id": "", "name": "", "arguments": []}
+            )
+            if delta.id:
+                call["id"] = delta.id
+            if delta.function:
+                call["name"] += delta.function.name or ""
+                if delta.function.arguments:
+                    call["arguments"].append(delta.function.arguments)
+
+        ready = []
+        last_index = max(self._calls)
+        for index in sorted(self._calls):
+            if index in self._ready:
+                continue
+            if index < last_index or self._arguments_complete(self._calls[index]):
+                ready.append(self._finalize(index))
+        return ready
+
+    def finish(self) -> List[ChatCompletionMessageToolCall]:
+        """Flush every call that has not been reported yet."""
+        return [
+            self._finalize(index)
+            for index in sorted(self._calls)
+            if index not in self._ready
+        ]
+
+    def tool_calls(self) -> List[ChatCompletionMessageToolCall]:
+        """All assembled calls in index order."""
+        return [self._ready[index] for index in sorted(self._ready)]
+
+    @staticmethod
+    def _arguments_complete(call: dict) -> bool:
+        if not call["id"] or not call["name"] or not call["arguments"]:
+            return False
+        # Only attempt a parse when the text could plausibly be a closed object
+        if not call["arguments"][-1].rstrip().endswith("}"):
+            return False
+        try:
+            json.loads("".join(call["arguments"]))
+        except json.JSONDecodeError:
+            return False
+        return True
+
+    def _finalize(self, index: int) -> ChatCompletionMessageToolCall:
+        call = self._calls[index]
+        tool_call = ChatCompletionMessageToolCall(
+            id=call["id"],
+            type="function",
+            function={"name": call["name"], "arguments": "".join(call["arguments"])},
+        )
+        self._ready[index] = tool_call
+        return tool_call
@@ -0,0 +1,14 @@
+SYSTEM_PROMPT = "你是一个对话摘要助手，负责把代理的执行历史压缩成简洁、准确的摘要。"
+
+SUMMARY_PROMPT = """请将以下代理执行历史压缩为一段摘要，供代理继续完成任务时参考。
+摘要需要保留：用户的原始任务和要求、已经完成的步骤及其关键结果（文件路径、数据、结论）、尚未解决的问题和下一步计划。
+省略重复的工具输出和无关细节，不要编造历史中没有的信息。
+
+执行历史：
+{history}
+"""
+
+# Appended to an assistant message in the history for each tool it called
+SUMMARY_TOOL_CALL = "\n[调用工具 {name}: {arguments}]"
+
+SUMMARY_MESSAGE = "以下是之前对话历史的摘要：\n{summary}"
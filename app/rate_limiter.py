@@ -0,0 +1,170 @@
+"""Admission control for outbound LLM requests."""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from app.logger import logger
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill(time.monotonic())
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill(time.monotonic())
+        self.tokens -= min(amount, self.capacity)
+
+
+class AdmissionController:
+    """Caps in-flight requests and requests/tokens per minute for one endpoint.
+
+    One controller is shared by every caller using the same LLM config name, so
+    concurrent agents queue here instead of tripping the provider's rate limits
+    and falling back to retry storms.
+    """
+
+    _controllers: Dict[str, "AdmissionController"] = {}
+
+    def __init__(
+        self,
+        max_concurrency: int = 0,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+    ):
+        self._semaphore = (
+            asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        )
+        self._requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        )
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._lock = asyncio.Lock()
+        self._paused_until = 0.0
+        self._waiting = 0
+        self._in_flight = 0
+
+    @classmethod
+    def for_config(
+        cls,
+        config_name: str,
+        max_concurrency: int = 0,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+    ) -> "AdmissionController":
+        """Return the controller shared by all clients of `config_name`."""
+        if config_name not in cls._controllers:
+            cls._controllers[config_name] = cls(
+                max_concurrency=max_concurrency,
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+            )
+        return cls._controllers[config_name]
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for admission."""
+        return self._waiting
+
+    @property
+    def in_flight(self) -> int:
+        """Number of admitted requests that have not finished yet."""
+        return self._in_flight
+
+    def pause(self, seconds: float) -> None:
+        """Hold back new admissions for `seconds` (e.g. from a Retry-After header)."""
+        if seconds <= 0:
+            return
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"LLM admission paused for {seconds:.1f}s")
+
+    def _delay(self, tokens: int) -> float:
+        delay = self._paused_until - time.monotonic()
+        if self._requests:
+            delay = max(delay, self._requests.delay_for(1))
+        if self._tokens and tokens:
+            delay = max(delay, self._tokens.delay_for(tokens))
+        return delay
+
+    @asynccontextmanager
+    async def admit(self, tokens: int = 0):
+        """Wait until the request may be sent and hold a slot while it runs.
+
+        Args:
+            tokens: Estimated tokens (prompt + completion) used by the request.
+        """
+        self._waiting += 1
+        try:
+            if self._semaphore:
+                await self._semaphore.acquire()
+            try:
+                # Serialize bucket checks so waiters are admitted in FIFO order
+                async with self._lock:
+                    while (delay := self._delay(tokens)) > 0:
+                        await asyncio.sleep(delay)
+                    if self._requests:
+                        self._requests.consume(1)
+                    if self._tokens and tokens:
+                        self._tokens.consume(tokens)
+            except BaseException:
+                if self._semaphore:
+                    self._semaphore.release()
+                raise
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            if self._semaphore:
+                self._semaphore.release()
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Extract the server-requested backoff from an API error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(retry_after).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
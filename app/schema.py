@@ -1,7 +1,8 @@
+import json
 from enum import Enum
-from typing import Any, List, Literal, Optional, Union
+from typing import Any, List, Literal, Optional, Tuple, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class AgentState(str, Enum):
@@ -27,7 +28,12 @@ class ToolCall(BaseModel):
 
 
 class Message(BaseModel):
-    """Represents a chat message in the conversation"""
+    """Represents a chat message in the conversation
+
+    The factory classmethods below build messages from values the agent already
+    produced, so they skip validation (`model_construct`); constructing a
+    Message directly still validates its input.
+    """
 
     role: Literal["system", "user", "assistant", "tool"] = Field(...)
     content: Optional[str] = Field(default=None)
@@ -35,6 +41,13 @@ class Message(BaseModel):
     name: Optional[str] = Field(default=None)
     tool_call_id: Optional[str] = Field(default=None)
 
+    _dict_cache: Optional[dict] = PrivateAttr(default=None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in self.model_fields:
+            self._dict_cache = None
+
     def __add__(self, other) -> List["Message"]:
         """支持 Message + list 或 Message + Message 的操作"""
         if isinstance(other, list):
@@ -56,37 +69,47 @@ class Message(BaseModel):
             )
 
     def to_dict(self) -> dict:
-        """Convert message to dictionary format"""
+        """Convert message to dictionary format.
+
+        The result is cached until a field is reassigned; treat it as read-only.
+        """
+        if self._dict_cache is not None:
+            return self._dict_cache
         message = {"role": self.role}
         if self.content is not None:
             message["content"] = self.content
         if self.tool_calls is not None:
-            message["tool_calls"] = [tool_call.dict() for tool_call in self.tool_calls]
+            message["tool_calls"] = [
+                tool_call.model_dump() for tool_call in self.tool_calls
+            ]
         if self.name is not None:
             message["name"] = self.name
         if self.tool_call_id is not None:
             message["tool_call_id"] = self.tool_call_id
+        self._dict_cache = message
         return message
 
     @classmethod
     def user_message(cls, content: str) -> "Message":
         """Create a user message"""
-        return cls(role="user", content=content)
+        return cls.model_construct(role="user", content=content)
 
     @classmethod
     def system_message(cls, content: str) -> "Message":
         """Create a system message"""
-        return cls(role="system", content=content)
+        return cls.model_construct(role="system", content=content)
 
     @classmethod
     def assistant_message(cls, content: Optional[str] = None) -> "Message":
         """Create an assistant message"""
-        return cls(role="assistant", content=content)
+        return cls.model_construct(role="assistant", content=content)
 
     @classmethod
     def tool_message(cls, content: str, name, tool_call_id: str) -> "Message":
         """Create a tool message"""
-        return cls(role="tool", content=content, name=name, tool_call_id=tool_call_id)
+        return cls.model_construct(
+            role="tool", content=content, name=name, tool_call_id=tool_call_id
+        )
 
     @classmethod
     def from_tool_calls(
@@ -99,37 +122,304 @@ class Message(BaseModel):
             content: Optional message content
         """
         formatted_calls = [
-            {"id": call.id, "function": call.function.model_dump(), "type": "function"}
+            ToolCall.model_construct(
+                id=call.id,
+                type="function",
+                function=Function.model_construct(
+                    name=call.function.name, arguments=call.function.arguments
+                ),
+            )
             for call in tool_calls
         ]
-        return cls(
+        return cls.model_construct(
             role="assistant", content=content, tool_calls=formatted_calls, **kwargs
         )
 
 
+def estimate_tokens(message: Message) -> int:
+    """Cheaply estimate the prompt tokens a message costs (~4 chars per token)."""
+    chars = len(message.content or "")
+    for tool_call in message.tool_calls or []:
+        chars += len(tool_call.function.name) + len(tool_call.function.arguments)
+    # A few tokens of per-message framing (role, separators, ids)
+    return chars // 4 + 4
+
+
+def loop_signature(message: Message) -> Optional[tuple]:
+    """Key identifying repeated assistant turns, or None for other messages.
+
+    Turns that call the same tools with the same arguments share a key even if
+    their accompanying text differs; text-only turns are keyed by their content.
+    """
+    if message.role != "assistant":
+        return None
+    if message.tool_calls:
+        return ("tool_calls",) + tuple(
+            (call.function.name, _normalize_arguments(call.function.arguments))
+            for call in message.tool_calls
+        )
+    if message.content:
+        return ("content", message.content)
+    return None
+
+
+def _normalize_arguments(arguments: str) -> str:
+    try:
+        return json.dumps(json.loads(arguments), sort_keys=True)
+    except (TypeError, ValueError):
+        return arguments
+
+
 class Memory(BaseModel):
     messages: List[Message] = Field(default_factory=list)
     max_messages: int = Field(default=100)
+    max_tokens: Optional[int] = Field(
+        default=None, description="Token budget for the stored history"
+    )
+    compact_tool_tokens: int = Field(
+        default=256, description="Tool outputs above this size are compacted first"
+    )
+
+    _token_counts: List[int] = PrivateAttr(default_factory=list)
+    _total_tokens: int = PrivateAttr(default=0)
+    _compact_cursor: int = PrivateAttr(default=0)
+    # Leading messages that are never evicted: the user's task, or the summary
+    # that replaced it (1 or 0)
+    _pinned: int = PrivateAttr(default=0)
+    # Messages ever dropped (all from the front, after the pinned task), so
+    # that (generation, _offset + i) names messages[i] stably while older
+    # messages are evicted
+    _offset: int = PrivateAttr(default=0)
+    _generation: int = PrivateAttr(default=0)
+    _signatures: List[Optional[tuple]] = PrivateAttr(default_factory=list)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._reindex()
+
+    @property
+    def total_tokens(self) -> int:
+        """Estimated tokens of all stored messages."""
+        self._sync()
+        return self._total_tokens
 
     def add_message(self, message: Message) -> None:
         """Add a message to memory"""
-        self.messages.append(message)
-        # Optional: Implement message limit
-        if len(self.messages) > self.max_messages:
-            self.messages = self.messages[-self.max_messages :]
+        self._sync()
+        self._append(message)
+        self._enforce_limits()
 
     def add_messages(self, messages: List[Message]) -> None:
         """Add multiple messages to memory"""
-        self.messages.extend(messages)
+        self._sync()
+        for message in messages:
+            self._append(message)
+        self._enforce_limits()
+
+    def set_messages(self, messages: List[Message]) -> None:
+        """Replace the stored history"""
+        self.messages = list(messages)
+        self._reindex()
+        self._enforce_limits()
 
     def clear(self) -> None:
         """Clear all messages"""
         self.messages.clear()
+        self._reindex()
 
     def get_recent_messages(self, n: int) -> List[Message]:
         """Get n most recent messages"""
         return self.messages[-n:]
 
     def to_dict_list(self) -> List[dict]:
-        """Convert messages to list of dicts"""
+        """Convert messages to list of dicts (each message caches its own dict)"""
         return [msg.to_dict() for msg in self.messages]
+
+    def repeat_count(self) -> int:
+        """How many assistant turns right before the latest one repeat it.
+
+        Only consecutive repeats count: alternating between the same few calls
+        (edit, run the tests, edit, ...) is normal progress. Walks back from the
+        end, so the cost is proportional to the repeats found, not the history.
+        See `loop_signature` for what counts as a repeat.
+        """
+        self._sync()
+        if not self.messages:
+            return 0
+        start = self._last_group_start()
+        signature = self._signatures[start]
+        if signature is None:
+            return 0
+        count = 0
+        for index in range(start - 1, -1, -1):
+            if self.messages[index].role != "assistant":
+                continue
+            if self._signatures[index] != signature:
+                break
+            count += 1
+        return count
+
+    def compactable_prefix(self, keep: int) -> List[Message]:
+        """Oldest messages that can be summarized while keeping `keep` recent ones.
+
+        The cut never falls inside a tool-call group.
+        """
+        cut = len(self.messages) - keep
+        while cut > 0 and self.messages[cut].role == "tool":
+            cut -= 1
+        return self.messages[: max(cut, 0)]
+
+    def mark(self, n: int) -> Tuple[int, int]:
+        """Stable position just after the first `n` messages.
+
+        It stays valid while messages are added, evicted or compacted, and
+        is invalidated only by `set_messages` or `clear`.
+        """
+        self._sync()
+        return self._generation, self._offset + n
+
+    def replace_prefix(self, end: Tuple[int, int], message: Message) -> bool:
+        """Replace everything before `end` (from `mark`) with a single message.
+
+        Messages in that range that were evicted or compacted in the meantime
+        are covered by `message` as well, so only what is left of the range is
+        dropped. Returns False (and changes nothing) if the history was replaced
+        since the mark was taken.
+        """
+        self._sync()
+        generation, position = end
+        if generation != self._generation:
+            return False
+        # The pinned task is in the range even if eviction has passed `end`
+        count = max(position - self._offset, self._pinned)
+        self._drop(0, min(count, len(self.messages)))
+        tokens = estimate_tokens(message)
+        self.messages.insert(0, message)
+        self._token_counts.insert(0, tokens)
+        self._total_tokens += tokens
+        self._signatures.insert(0, loop_signature(message))
+        self._compact_cursor += 1
+        self._offset -= 1
+        # The summary stands in for the task and is kept like it
+        self._pinned = 1
+        self._enforce_limits()
+        return True
+
+    def _append(self, message: Message) -> None:
+        if not self.messages:
+            self._pinned = int(message.role == "user")
+        tokens = estimate_tokens(message)
+        self.messages.append(message)
+        self._token_counts.append(tokens)
+        self._total_tokens += tokens
+        self._signatures.append(loop_signature(message))
+
+    def _drop(self, start: int, n: int) -> None:
+        end = start + n
+        self._total_tokens -= sum(self._token_counts[start:end])
+        del self.messages[start:end]
+        del self._token_counts[start:end]
+        del self._signatures[start:end]
+        if self._compact_cursor >= end:
+            self._compact_cursor -= n
+        else:
+            self._compact_cursor = min(self._compact_cursor, start)
+        self._offset += n
+
+    def _replace(self, index: int, message: Message) -> None:
+        tokens = estimate_tokens(message)
+        self._total_tokens += tokens - self._token_counts[index]
+        self.messages[index] = message
+        self._token_counts[index] = tokens
+        self._signatures[index] = loop_signature(message)
+
+    def _reindex(self) -> None:
+        self._token_counts = [estimate_tokens(msg) for msg in self.messages]
+        self._total_tokens = sum(self._token_counts)
+        self._compact_cursor = 0
+        self._pinned = int(bool(self.messages) and self.messages[0].role == "user")
+        self._offset = 0
+        self._generation += 1
+        self._signatures = [loop_signature(msg) for msg in self.messages]
+
+    def _sync(self) -> None:
+        # Fall back to a full rebuild if the list was mutated behind our back
+        if len(self._token_counts) != len(self.messages):
+            self._reindex()
+
+    def _group_size(self, start: int) -> int:
+        """Length of the message group at `start`.
+
+        An assistant message with tool calls and the tool replies that follow it
+        form one group, so eviction never separates a call from its result.
+        """
+        end = start + 1
+        if self.messages[start].role == "tool" or self.messages[start].tool_calls:
+            while end < len(self.messages) and self.messages[end].role == "tool":
+                end += 1
+        return end - start
+
+    def _last_group_start(self) -> int:
+        start = len(self.messages) - 1
+        while start > 0 and self.messages[start].role == "tool":
+            start -= 1
+        return start
+
+    def _compact_oldest_tool_output(self) -> bool:
+        """Shrink the oldest large tool output outside the latest group."""
+        limit = self._last_group_start()
+        for index in range(self._compact_cursor, limit):
+            if (
+                self.messages[index].role == "tool"
+                and self._token_counts[index] > self.compact_tool_tokens
+            ):
+                self._truncate_tool_output(index, self.compact_tool_tokens * 2)
+                self._compact_cursor = index + 1
+                return True
+        self._compact_cursor = limit
+        return False
+
+    def _truncate_latest_tool_outputs(self) -> None:
+        """Cut the tool outputs of the latest group until the history fits."""
+        for index in range(len(self.messages) - 1, self._last_group_start(), -1):
+            excess = self._total_tokens - self.max_tokens
+            if excess <= 0:
+                return
+            content = self.messages[index].content or ""
+            # Leave room for the note that replaces the removed text
+            keep = max(len(content) - (excess + 20) * 4, 0)
+            if keep < len(content):
+                self._truncate_tool_output(index, keep)
+
+    def _truncate_tool_output(self, index: int, keep: int) -> None:
+        message = self.messages[index]
+        content = message.content or ""
+        self._replace(
+            index,
+            Message.tool_message(
+                f"{content[:keep]}\n... [{len(content) - keep} characters of "
+                "tool output removed to save context]",
+                name=message.name,
+                tool_call_id=message.tool_call_id,
+            ),
+        )
+
+    def _evict_oldest_group(self) -> bool:
+        """Drop the oldest group after the pinned task, never the latest group."""
+        start = self._pinned
+        if start >= self._last_group_start():
+            return False
+        self._drop(start, self._group_size(start))
+        return True
+
+    def _enforce_limits(self) -> None:
+        while len(self.messages) > self.max_messages and self._evict_oldest_group():
+            pass
+
+        if self.max_tokens is None:
+            return
+        while self._total_tokens > self.max_tokens:
+            if self._compact_oldest_tool_output() or self._evict_oldest_group():
+                continue
+            # Only the task and the latest group are left
+            self._truncate_latest_tool_outputs()
+            break
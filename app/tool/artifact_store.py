@@ -0,0 +1,79 @@
+"""Content-addressed store for binary tool outputs (screenshots, downloads).
+
+Tools write blobs here and return a small reference instead of carrying
+megabytes of base64 through agent memory, logs and the websocket. The web app
+serves stored blobs under `ARTIFACT_URL_PREFIX`.
+"""
+
+import hashlib
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from app.config import WORKSPACE_ROOT
+
+
+ARTIFACT_DIR_NAME = ".artifacts"
+ARTIFACT_URL_PREFIX = "/api/artifacts/"
+
+# Job workspace of the session running in this context. The web app sets it per
+# session, since the process-wide working directory is shared by all of them.
+session_workspace: ContextVar[Optional[Path]] = ContextVar(
+    "session_workspace", default=None
+)
+
+
+def current_workspace() -> Path:
+    """The session's job workspace, else the job workspace the process is
+    working in, else the workspace root."""
+    workspace = session_workspace.get()
+    if workspace is not None:
+        return workspace
+    cwd = Path.cwd().resolve()
+    root = WORKSPACE_ROOT.resolve()
+    return cwd if cwd == root or root in cwd.parents else root
+
+
+@dataclass(frozen=True)
+class ArtifactRef:
+    path: Path  # absolute path of the stored blob
+    sha256: str
+    size: int
+
+    @property
+    def url(self) -> str:
+        relative = self.path.relative_to(WORKSPACE_ROOT.resolve())
+        return ARTIFACT_URL_PREFIX + relative.as_posix()
+
+
+def store_artifact(data: bytes, suffix: str = "") -> ArtifactRef:
+    """Save `data` under the current workspace, named by its SHA-256.
+
+    Identical blobs are stored once; existing files are never rewritten.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    directory = current_workspace() / ARTIFACT_DIR_NAME / digest[:2]
+    path = directory / f"{digest}{suffix}"
+    if not path.exists():
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = directory / f".{digest}.{uuid.uuid4().hex[:8]}.tmp"
+        tmp.write_bytes(data)
+        tmp.replace(path)
+    return ArtifactRef(path=path, sha256=digest, size=len(data))
+
+
+def resolve_artifact(relative_path: str) -> Path:
+    """Absolute path of a stored artifact from its URL path.
+
+    Raises ValueError if the path points outside an artifact directory.
+    """
+    root = WORKSPACE_ROOT.resolve()
+    path = (root / relative_path).resolve()
+    if (
+        root not in path.parents
+        or ARTIFACT_DIR_NAME not in path.relative_to(root).parts
+    ):
+        raise ValueError(f"Not an artifact: {relative_path}")
+    return path
@@ -24,6 +24,8 @@ The tool returns a list of URLs that match the search query.
         },
         "required": ["query"],
     }
+    speculative_safe: bool = True
+    concurrency_safe: bool = True
 
     async def execute(self, query: str, num_results: int = 10) -> List[str]:
         """
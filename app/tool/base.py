@@ -1,13 +1,27 @@
+import os
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional
 
 from pydantic import BaseModel, Field
 
 
+# Concurrency key of a call that must not overlap with any other call
+EXCLUSIVE = "*"
+
+
+def file_resource(path: str) -> str:
+    """Concurrency key shared by every tool that writes the file at `path`."""
+    return f"file:{os.path.realpath(path)}"
+
+
 class BaseTool(ABC, BaseModel):
     name: str
     description: str
     parameters: Optional[dict] = None
+    # Read-only, idempotent tools may be started before the model finishes its reply
+    speculative_safe: bool = False
+    # Calls to concurrency-safe tools may run in parallel with each other
+    concurrency_safe: bool = False
 
     class Config:
         arbitrary_types_allowed = True
@@ -20,6 +34,21 @@ class BaseTool(ABC, BaseModel):
     async def execute(self, **kwargs) -> Any:
         """Execute the tool with given parameters."""
 
+    def can_speculate(self, **kwargs) -> bool:
+        """Whether a call with these arguments is safe to start speculatively."""
+        return self.speculative_safe
+
+    def concurrency_key(self, **kwargs) -> Optional[str]:
+        """Resource a call needs exclusive access to.
+
+        None means the call can run concurrently with anything. Calls sharing
+        a key run one at a time, in order, and an `EXCLUSIVE` call waits for
+        every earlier call and holds back every later one. Tools that are not
+        concurrency-safe are exclusive unless they narrow this down, e.g. to
+        the `file_resource` they write.
+        """
+        return None if self.concurrency_safe else EXCLUSIVE
+
     def to_param(self) -> Dict:
         """Convert tool to function call format."""
         return {
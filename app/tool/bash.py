@@ -1,9 +1,15 @@
 import asyncio
 import os
+import shlex
+import signal
+import weakref
 from typing import Optional
 
 from app.exceptions import ToolError
+from app.tool.artifact_store import session_workspace
 from app.tool.base import BaseTool, CLIResult, ToolResult
+from app.tool.output_capture import OutputCapture
+from app.tool.process_pool import WarmPool
 
 
 _BASH_DESCRIPTION = """Execute a bash command in the terminal.
@@ -20,13 +26,21 @@ class _BashSession:
     _process: asyncio.subprocess.Process
 
     command: str = "/bin/bash"
-    _output_delay: float = 0.2  # seconds
     _timeout: float = 120.0  # seconds
     _sentinel: str = "<<exit>>"
+    _read_size: int = 64 * 1024
+    _max_pending: int = 1024 * 1024  # unclaimed output kept between commands
 
     def __init__(self):
         self._started = False
         self._timed_out = False
+        self._running = False
+        self.cwd: Optional[str] = None  # shell's working directory after last command
+        # Bytes read from stdout/stderr that no command has claimed yet
+        self._stdout = bytearray()
+        self._stderr = bytearray()
+        self._output_event = asyncio.Event()
+        self._readers: list[asyncio.Task] = []
 
     async def start(self):
         if self._started:
@@ -41,13 +55,56 @@ class _BashSession:
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
         )
+        self._readers = [
+            asyncio.create_task(self._read(self._process.stdout, self._stdout)),
+            asyncio.create_task(self._read(self._process.stderr, self._stderr)),
+        ]
 
         self._started = True
 
+    @property
+    def alive(self) -> bool:
+        return self._started and self._process.returncode is None
+
+    @property
+    def timed_out(self) -> bool:
+        return self._timed_out
+
+    async def chdir(self, path: str) -> None:
+        """Change the shell's working directory."""
+        await self.run(f"cd {shlex.quote(path)}")
+
+    async def wait(self) -> None:
+        await self._process.wait()
+
+    def kill(self) -> None:
+        """Kill the shell and everything it started (it leads its own process group)."""
+        if not self._started:
+            return
+        for reader in self._readers:
+            reader.cancel()
+        if self._process.returncode is None:
+            try:
+                os.killpg(self._process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    async def _read(self, stream: asyncio.StreamReader, buffer: bytearray):
+        """Move output into `buffer` as it arrives and wake up the waiting run()."""
+        while chunk := await stream.read(self._read_size):
+            buffer.extend(chunk)
+            if not self._running and len(buffer) > self._max_pending:
+                # Output of background jobs between commands: keep the latest
+                del buffer[: len(buffer) - self._max_pending]
+            self._output_event.set()
+        self._output_event.set()
+
     def stop(self):
         """Terminate the bash shell."""
         if not self._started:
             raise ToolError("Session has not started.")
+        for reader in self._readers:
+            reader.cancel()
         if self._process.returncode is not None:
             return
         self._process.terminate()
@@ -68,53 +125,113 @@ class _BashSession:
 
         # we know these are not None because we created the process with PIPEs
         assert self._process.stdin
-        assert self._process.stdout
-        assert self._process.stderr
 
-        # send command to the process
+        # send command to the process; the sentinel goes to both streams so we
+        # know stderr has been fully read too
         self._process.stdin.write(
-            command.encode() + f"; echo '{self._sentinel}'\n".encode()
+            command.encode()
+            + f"; echo \"{self._sentinel}$PWD\"; echo '{self._sentinel}' >&2\n".encode()
         )
         await self._process.stdin.drain()
 
-        # read output from the process, until the sentinel is found
+        # move output into bounded captures as it arrives until both streams
+        # have shown the sentinel
+        stdout = OutputCapture("bash")
+        stderr = OutputCapture("bash_stderr")
+        stdout_done = stderr_done = False
+        self._running = True
         try:
             async with asyncio.timeout(self._timeout):
                 while True:
-                    await asyncio.sleep(self._output_delay)
-                    # if we read directly from stdout/stderr, it will wait forever for
-                    # EOF. use the StreamReader buffer directly instead.
-                    output = (
-                        self._process.stdout._buffer.decode()
-                    )  # pyright: ignore[reportAttributeAccessIssue]
-                    if self._sentinel in output:
-                        # strip the sentinel and break
-                        output = output[: output.index(self._sentinel)]
+                    stdout_done = stdout_done or self._claim(
+                        self._stdout, stdout, record_cwd=True
+                    )
+                    stderr_done = stderr_done or self._claim(self._stderr, stderr)
+                    if stdout_done and stderr_done:
                         break
+                    if all(reader.done() for reader in self._readers):
+                        # bash exited before finishing the command (e.g. `exit`)
+                        await self._process.wait()
+                        return ToolResult(
+                            system="tool must be restarted",
+                            error=f"bash has exited with returncode {self._process.returncode}",
+                        )
+                    await self._output_event.wait()
+                    self._output_event.clear()
         except asyncio.TimeoutError:
             self._timed_out = True
             raise ToolError(
                 f"timed out: bash has not returned in {self._timeout} seconds and must be restarted",
             ) from None
+        finally:
+            self._running = False
+            stdout.close()
+            stderr.close()
+
+        return CLIResult(output=self._text(stdout), error=self._text(stderr))
+
+    def _claim(
+        self, buffer: bytearray, capture: OutputCapture, record_cwd: bool = False
+    ) -> bool:
+        """Move pending bytes into `capture`; True once the sentinel was reached.
 
-        if output.endswith("\n"):
-            output = output[:-1]
+        Only the new bytes (plus a sentinel-sized overlap) are ever searched. On
+        stdout the sentinel line also carries the shell's working directory.
+        """
+        sentinel = self._sentinel.encode()
+        end = buffer.find(sentinel)
+        if end >= 0:
+            capture.feed(bytes(buffer[:end]))
+            del buffer[:end]
+            line_end = buffer.find(b"\n")
+            if line_end < 0:
+                return False  # rest of the sentinel line hasn't arrived yet
+            if record_cwd:
+                self.cwd = buffer[len(sentinel) : line_end].decode(errors="replace")
+            del buffer[: line_end + 1]
+            return True
+        # hold back a possible partial sentinel at the end
+        keep = len(sentinel) - 1
+        if len(buffer) > keep:
+            capture.feed(bytes(buffer[:-keep]))
+            del buffer[:-keep]
+        return False
 
-        error = (
-            self._process.stderr._buffer.decode()
-        )  # pyright: ignore[reportAttributeAccessIssue]
-        if error.endswith("\n"):
-            error = error[:-1]
+    @staticmethod
+    def _text(capture: OutputCapture) -> str:
+        text = capture.text()
+        if text.endswith("\n"):
+            text = text[:-1]
+        return text
 
-        # clear the buffers so that the next output can be read correctly
-        self._process.stdout._buffer.clear()  # pyright: ignore[reportAttributeAccessIssue]
-        self._process.stderr._buffer.clear()  # pyright: ignore[reportAttributeAccessIssue]
 
-        return CLIResult(output=output, error=error)
+async def _start_session() -> _BashSession:
+    session = _BashSession()
+    await session.start()
+    return session
+
+
+def _start_dir() -> str:
+    """Where a tool's first shell starts: the session's workspace, if any."""
+    workspace = session_workspace.get()
+    return str(workspace) if workspace is not None else os.getcwd()
+
+
+_pool: Optional[WarmPool[_BashSession]] = None
+
+
+def _get_session_pool() -> WarmPool[_BashSession]:
+    global _pool
+    if _pool is None:
+        _pool = WarmPool(_start_session)
+    return _pool
 
 
 class Bash(BaseTool):
-    """A tool for executing bash commands"""
+    """A tool for executing bash commands
+
+    Each instance leases its own shell, so give every agent its own instance.
+    """
 
     name: str = "bash"
     description: str = _BASH_DESCRIPTION
@@ -130,27 +247,57 @@ class Bash(BaseTool):
     }
 
     _session: Optional[_BashSession] = None
+    _finalizer: Optional[weakref.finalize] = None
 
     async def execute(
         self, command: str | None = None, restart: bool = False, **kwargs
     ) -> CLIResult:
         if restart:
-            if self._session:
-                self._session.stop()
-            self._session = _BashSession()
-            await self._session.start()
+            self._discard_session()
+            await self._acquire_session(_start_dir())
 
             return ToolResult(system="tool has been restarted.")
 
-        if self._session is None:
-            self._session = _BashSession()
-            await self._session.start()
+        if self._session is None or not self._session.alive:
+            # A shell that exited is replaced in the directory it was last in
+            cwd = self._session.cwd if self._session else None
+            self._discard_session()
+            await self._acquire_session(cwd or _start_dir())
 
         if command is not None:
-            return await self._session.run(command)
+            try:
+                return await self._session.run(command)
+            except ToolError:
+                if not self._session.timed_out:
+                    raise
+                # Replace the hung shell so the next command just works
+                timeout = self._session._timeout
+                cwd = self._session.cwd or _start_dir()
+                self._discard_session()
+                await self._acquire_session(cwd)
+                raise ToolError(
+                    f"timed out: bash has not returned in {timeout} seconds; it was "
+                    f"killed and a new shell was started in {cwd}"
+                ) from None
 
         raise ToolError("no command provided.")
 
+    async def _acquire_session(self, cwd: str) -> None:
+        self._session = await _get_session_pool().acquire()
+        await self._session.chdir(cwd)
+        # Don't leave the shell running once the tool is gone
+        self._finalizer = weakref.finalize(self, self._session.kill)
+
+    def _discard_session(self) -> None:
+        if self._session is not None:
+            self._finalizer.detach()
+            _get_session_pool().discard(self._session)
+            self._session = None
+
+    async def cleanup(self) -> None:
+        """Stop this tool's shell."""
+        self._discard_session()
+
 
 if __name__ == "__main__":
     bash = Bash()
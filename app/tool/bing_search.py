@@ -1,11 +1,15 @@
 import asyncio
-from typing import List
-import requests
+import math
+from typing import List, Optional
+from urllib.parse import parse_qsl, quote_plus, urlencode, urlsplit, urlunsplit
 from app.logger import logger
 from bs4 import BeautifulSoup
 from app.tool.base import BaseTool
+from app.tool.http_client import get_http_client
+from app.tool.ttl_cache import TTLCache
 
 ABSTRACT_MAX_LENGTH = 300
+SEARCH_CACHE_TTL = 300  # seconds
 
 USER_AGENTS = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/68.0.3440.106 Safari/537.36',
@@ -32,6 +36,9 @@ HEADERS = {
 BING_HOST_URL = "https://cn.bing.com"
 BING_SEARCH_URL = "https://cn.bing.com/search?q="
 
+# (query, num_results) -> URLs, shared by all sessions
+_search_cache: TTLCache = TTLCache(SEARCH_CACHE_TTL)
+
 
 class BingSearch(BaseTool):
     name: str = "bing_search"
@@ -54,70 +61,111 @@ The tool returns a list of URLs that match the search query.
         },
         "required": ["query"],
     }
+    speculative_safe: bool = True
+    concurrency_safe: bool = True
 
-    session: requests.Session = None
-
-    def __init__(self, **data):
-        """Initialize the BingSearch tool with a requests session."""
-        super().__init__(**data)
-        self.session = requests.Session()
-        self.session.headers.update(HEADERS)
-
-    def _search_sync(self, query: str, num_results: int = 10) -> List[str]:
+    async def _search(self, query: str, num_results: int = 10) -> List[str]:
         """
-        Synchronous Bing search implementation to retrieve a list of URLs matching a query.
-        
+        Bing search implementation to retrieve a list of URLs matching a query.
+
         Args:
             query (str): The search query to submit to Bing. Must not be empty.
             num_results (int, optional): The maximum number of URLs to return. Defaults to 10.
 
         Returns:
-            List[str]: A list of URLs from the search results, capped at `num_results`. 
+            List[str]: A list of URLs from the search results, capped at `num_results`.
                        Returns an empty list if the query is empty or no results are found.
 
         Notes:
-            - Pagination is handled by incrementing the `first` parameter and following `next_url` links.
+            - Results are cached for `SEARCH_CACHE_TTL` seconds per (query, num_results).
+            - Once the first page shows how the `first` parameter advances, the remaining
+              pages are fetched concurrently; otherwise `next_url` links are followed.
             - If fewer results than `num_results` are available, all found URLs are returned.
         """
         if not query:
             return []
 
-        list_result = []
-        first = 1
-        next_url = BING_SEARCH_URL + query
-
-        while len(list_result) < num_results:
-            data, next_url = self._parse_html(next_url, rank_start=len(list_result), first=first)
-            if data:
+        cached = _search_cache.get((query, num_results))
+        if cached is not None:
+            return list(cached)
+
+        data, next_url = await self._fetch_page(BING_SEARCH_URL + quote_plus(query))
+        list_result = [item["url"] for item in data]
+
+        first = self._first_param(next_url)
+        if next_url and first and len(list_result) < num_results:
+            step = first - 1
+            pages = math.ceil((num_results - len(list_result)) / step)
+            results = await asyncio.gather(
+                *(
+                    self._fetch_page(
+                        self._with_first(next_url, first + step * i),
+                        rank_start=len(list_result) + step * i,
+                    )
+                    for i in range(pages)
+                )
+            )
+            for page_data, _ in results:
+                list_result.extend([item["url"] for item in page_data])
+        else:
+            while next_url and len(list_result) < num_results:
+                data, next_url = await self._fetch_page(next_url, rank_start=len(list_result))
                 list_result.extend([item["url"] for item in data])
-            if not next_url:
-                break
-            first += 10
 
-        return list_result[:num_results]
+        list_result = list_result[:num_results]
+        if list_result:
+            _search_cache.set((query, num_results), list_result)
+        return list(list_result)
+
+    @staticmethod
+    def _first_param(url: Optional[str]) -> Optional[int]:
+        """The `first` result offset in a results page URL, if it has a usable one."""
+        if not url:
+            return None
+        value = dict(parse_qsl(urlsplit(url).query)).get("first", "")
+        return int(value) if value.isdigit() and int(value) > 1 else None
+
+    @staticmethod
+    def _with_first(url: str, first: int) -> str:
+        parts = urlsplit(url)
+        query = dict(parse_qsl(parts.query))
+        query["first"] = str(first)
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    async def _fetch_page(self, url: str, rank_start: int = 0) -> tuple:
+        """
+        Fetch a Bing search results page over the shared HTTP client and parse it off the event loop.
+
+        Returns:
+            tuple: The results and next page URL, as returned by `_parse_html`.
+        """
+        try:
+            res = await get_http_client().get(url, headers=HEADERS)
+            html = res.content.decode("utf-8", errors="replace")
+        except Exception as e:
+            logger.warning(f"Error fetching Bing results: {e}")
+            return [], None
+        return await asyncio.to_thread(self._parse_html, html, rank_start)
 
-    def _parse_html(self, url: str, rank_start: int = 0, first: int = 1) -> tuple:
+    def _parse_html(self, html: str, rank_start: int = 0) -> tuple:
         """
         Parse Bing search result HTML synchronously to extract search results and the next page URL.
 
         Args:
-            url (str): The URL of the Bing search results page to parse.
+            html (str): The HTML of the Bing search results page to parse.
             rank_start (int, optional): The starting rank for numbering the search results. Defaults to 0.
-            first (int, optional): Unused parameter (possibly legacy). Defaults to 1.
         Returns:
             tuple: A tuple containing:
                 - list: A list of dictionaries with keys 'title', 'abstract', 'url', and 'rank' for each result.
                 - str or None: The URL of the next results page, or None if there is no next page.
         Example:
-            This function is called by `execute` in the following way:
+            This function is called by `_fetch_page` in the following way:
             ```python
-            results, next_url = self._parse_html(url, rank_start=0)
+            results, next_url = await asyncio.to_thread(self._parse_html, html, 0)
             ```
         """
         try:
-            res = self.session.get(url=url)
-            res.encoding = "utf-8"
-            root = BeautifulSoup(res.text, "lxml")
+            root = BeautifulSoup(html, "lxml")
 
             list_data = []
             ol_results = root.find("ol", id="b_results")
@@ -167,8 +215,4 @@ The tool returns a list of URLs that match the search query.
         Returns:
             List[str]: A list of URLs matching the search query.
         """
-        loop = asyncio.get_event_loop()
-        links = await loop.run_in_executor(
-            None, lambda: self._search_sync(query, num_results=num_results)
-        )
-        return links
+        return await self._search(query, num_results=num_results)
@@ -0,0 +1,133 @@
+"""Process-wide browser with pre-warmed contexts leased to BrowserUseTool instances."""
+
+import asyncio
+from typing import Optional
+
+from browser_use import Browser as BrowserUseBrowser
+from browser_use import BrowserConfig
+from browser_use.browser.context import BrowserContext
+
+from app.config import config
+from app.logger import logger
+from app.tool.process_pool import WarmPool
+
+
+class PooledContext:
+    """A browser context (own cookies, storage and tabs) leased to one tool."""
+
+    def __init__(self, context: BrowserContext):
+        self.context = context
+        self.pages = 0  # navigations since the context was created
+        self._closed = False
+        self._closing: Optional[asyncio.Future] = None
+
+    @classmethod
+    async def start(cls, browser: BrowserUseBrowser) -> "PooledContext":
+        context = await browser.new_context()
+        # Creates the playwright context and its first page: the slow part
+        session = await context.get_session()
+        pooled = cls(context)
+        session.context.on("close", lambda _: pooled._mark_closed())
+        return pooled
+
+    @property
+    def alive(self) -> bool:
+        session = self.context.session
+        if self._closed or session is None:
+            return False
+        browser = session.context.browser
+        return browser is None or browser.is_connected()
+
+    def _mark_closed(self) -> None:
+        self._closed = True
+
+    def kill(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._closing = asyncio.ensure_future(self.context.close())
+        except RuntimeError:
+            pass  # no event loop: the browser goes away with it
+
+    async def wait(self) -> None:
+        if self._closing is not None:
+            await asyncio.gather(self._closing, return_exceptions=True)
+
+
+class BrowserPool:
+    """One shared browser per event loop, with `size` contexts kept warm.
+
+    Contexts are never handed to a second tool, so sessions don't share cookies
+    or tabs; a released context is closed and the pool starts a fresh one in
+    the background. If the browser crashes it is relaunched for the next context.
+    """
+
+    def __init__(self, headless: bool = True, size: int = 2, max_pages: int = 100):
+        self.headless = headless
+        self.max_pages = max_pages
+        self._contexts: WarmPool[PooledContext] = WarmPool(self._start_context, size)
+        self._browser: Optional[BrowserUseBrowser] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def lease(self) -> PooledContext:
+        return await self._contexts.acquire()
+
+    def release(self, lease: PooledContext) -> None:
+        self._contexts.discard(lease)
+
+    def needs_recycling(self, lease: PooledContext) -> bool:
+        return not lease.alive or lease.pages >= self.max_pages
+
+    async def _start_context(self) -> PooledContext:
+        return await PooledContext.start(await self._get_browser())
+
+    async def _get_browser(self) -> BrowserUseBrowser:
+        # Playwright objects belong to the event loop that created them
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._browser = None
+        async with self._lock:
+            if self._browser is not None and not self._connected(self._browser):
+                logger.warning("Shared browser disconnected, relaunching it")
+                asyncio.ensure_future(self._browser.close())
+                self._browser = None
+            if self._browser is None:
+                browser = BrowserUseBrowser(BrowserConfig(headless=self.headless))
+                await browser.get_playwright_browser()
+                loop.create_task(self._close_on_shutdown(browser))
+                self._browser = browser
+            return self._browser
+
+    @staticmethod
+    def _connected(browser: BrowserUseBrowser) -> bool:
+        return (
+            browser.playwright_browser is not None
+            and browser.playwright_browser.is_connected()
+        )
+
+    @staticmethod
+    async def _close_on_shutdown(browser: BrowserUseBrowser) -> None:
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            await browser.close()
+            raise
+
+
+_pool: Optional[BrowserPool] = None
+
+
+def get_browser_pool() -> BrowserPool:
+    global _pool
+    if _pool is None:
+        settings = config.llm["default"]
+        _pool = BrowserPool(
+            headless=settings.browser_headless,
+            size=settings.browser_pool_size,
+            max_pages=settings.browser_max_pages,
+        )
+    return _pool
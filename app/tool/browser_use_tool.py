@@ -1,16 +1,27 @@
 import asyncio
 import json
 import logging  # 添加导入
-from typing import Optional
+import weakref
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 
-from browser_use import Browser as BrowserUseBrowser
-from browser_use import BrowserConfig
 from browser_use.browser.context import BrowserContext
 from browser_use.dom.service import DomService
-from pydantic import Field, field_validator
+from pydantic import Field, PrivateAttr, field_validator
 from pydantic_core.core_schema import ValidationInfo
 
+from app.tool.artifact_store import store_artifact
 from app.tool.base import BaseTool, ToolResult
+from app.tool.browser_pool import PooledContext, get_browser_pool
+from app.tool.dom_state import (
+    DOM_VERSION_JS,
+    UNCHANGED_NOTE,
+    PageState,
+    content_version,
+    element_changes,
+    parse_elements,
+)
+from app.tool.page_text import MAX_CACHED_PAGES, ChunkedText
 
 
 _BROWSER_DESCRIPTION = """
@@ -20,9 +31,10 @@ content extraction, and tab management. Supported actions include:
 - 'click': Click an element by index
 - 'input_text': Input text into an element
 - 'screenshot': Capture a screenshot
-- 'get_html': Get page HTML content
-- 'get_text': Get text content of the page
+- 'get_html': Get page HTML content, in chunks
+- 'get_text': Get text content of the page, in chunks (use 'chunk_index' to page, or 'query' to get the best matching chunks)
 - 'read_links': Get all links on the page
+- 'get_state': Get the URL, title, tabs and interactive elements (with the indices used by 'click' and 'input_text'); after the first call only the elements that changed are listed
 - 'execute_js': Execute JavaScript code
 - 'scroll': Scroll the page
 - 'switch_tab': Switch to a specific tab
@@ -47,6 +59,7 @@ class BrowserUseTool(BaseTool):
                     "screenshot",
                     "get_html",
                     "get_text",
+                    "get_state",
                     "execute_js",
                     "scroll",
                     "switch_tab",
@@ -77,6 +90,14 @@ class BrowserUseTool(BaseTool):
                 "type": "integer",
                 "description": "Tab ID for 'switch_tab' action",
             },
+            "chunk_index": {
+                "type": "integer",
+                "description": "Chunk to return for 'get_text' or 'get_html' actions, starting at 0 (default 0)",
+            },
+            "query": {
+                "type": "string",
+                "description": "For 'get_text' or 'get_html' actions: return the chunks most relevant to this query instead",
+            },
         },
         "required": ["action"],
         "dependencies": {
@@ -91,25 +112,58 @@ class BrowserUseTool(BaseTool):
     }
 
     lock: asyncio.Lock = Field(default_factory=asyncio.Lock)
-    browser: Optional[BrowserUseBrowser] = Field(default=None, exclude=True)
+    # 从共享浏览器池租用的独立上下文（各会话互不共享cookie和标签页）
+    lease: Optional[PooledContext] = Field(default=None, exclude=True)
     context: Optional[BrowserContext] = Field(default=None, exclude=True)
     dom_service: Optional[DomService] = Field(default=None, exclude=True)
 
+    def can_speculate(self, action: str = None, **kwargs) -> bool:
+        """Only reading the current page is safe to start speculatively."""
+        return action in ("get_text", "get_html")
+
     @field_validator("parameters", mode="before")
     def validate_parameters(cls, v: dict, info: ValidationInfo) -> dict:
         if not v:
             raise ValueError("Parameters cannot be empty")
         return v
 
-    async def _ensure_browser_initialized(self) -> BrowserContext:
-        """Ensure browser and context are initialized."""
-        if self.browser is None:
-            self.browser = BrowserUseBrowser(BrowserConfig(headless=False))
-        if self.context is None:
-            self.context = await self.browser.new_context()
+    _finalizer: Optional[weakref.finalize] = None
+    # Last state returned per tab (keyed by page object id)
+    _page_states: Dict[int, PageState] = PrivateAttr(default_factory=dict)
+    # Chunked text/HTML of recently read pages, keyed by
+    # (kind, page object id, url, content version)
+    _page_texts: "OrderedDict[Tuple[str, int, str, str], ChunkedText]" = PrivateAttr(
+        default_factory=OrderedDict
+    )
+
+    async def _ensure_browser_initialized(
+        self, recycle: bool = False
+    ) -> BrowserContext:
+        """Ensure a browser context is leased; replace it if it crashed or, when
+        `recycle` is set, if it has served its share of pages."""
+        pool = get_browser_pool()
+        if self.lease is not None and (
+            not self.lease.alive or (recycle and pool.needs_recycling(self.lease))
+        ):
+            self._release_context()
+        if self.lease is None:
+            self.lease = await pool.lease()
+            # 工具被回收时归还上下文
+            self._finalizer = weakref.finalize(self, pool.release, self.lease)
+            self.context = self.lease.context
             self.dom_service = DomService(await self.context.get_current_page())
         return self.context
 
+    def _release_context(self) -> None:
+        if self.lease is not None:
+            self._finalizer.detach()
+            get_browser_pool().release(self.lease)
+            self.lease = None
+            self.context = None
+            self.dom_service = None
+            self._page_states.clear()
+            self._page_texts.clear()
+
     async def execute(
         self,
         action: str,
@@ -119,6 +173,8 @@ class BrowserUseTool(BaseTool):
         script: Optional[str] = None,
         scroll_amount: Optional[int] = None,
         tab_id: Optional[int] = None,
+        chunk_index: Optional[int] = None,
+        query: Optional[str] = None,
         **kwargs,
     ) -> ToolResult:
         """
@@ -132,14 +188,25 @@ class BrowserUseTool(BaseTool):
             script: JavaScript code for execution
             scroll_amount: Pixels to scroll for scroll action
             tab_id: Tab ID for switch_tab action
+            chunk_index: Chunk to return for get_text / get_html
+            query: Return the chunks best matching this query for get_text / get_html
             **kwargs: Additional arguments
 
         Returns:
             ToolResult with the action's output or error
         """
+        if action == "get_state":
+            return await self.get_current_state()
+
         async with self.lock:
             try:
-                context = await self._ensure_browser_initialized()
+                # Navigations replace the page anyway, so that is when a worn
+                # context is swapped for a fresh one
+                context = await self._ensure_browser_initialized(
+                    recycle=action in ("navigate", "new_tab")
+                )
+                if action in ("navigate", "new_tab"):
+                    self.lease.pages += 1
 
                 if action == "navigate":
                     if not url:
@@ -173,20 +240,19 @@ class BrowserUseTool(BaseTool):
                     )
 
                 elif action == "screenshot":
-                    screenshot = await context.take_screenshot(full_page=True)
+                    # PNG bytes go straight to the artifact store, never through base64
+                    page = await context.get_current_page()
+                    await page.bring_to_front()
+                    await page.wait_for_load_state()
+                    png = await page.screenshot(full_page=True, animations="disabled")
+                    ref = await asyncio.to_thread(store_artifact, png, ".png")
                     return ToolResult(
-                        output=f"Screenshot captured (base64 length: {len(screenshot)})",
-                        system=screenshot,
+                        output=f"Screenshot captured ({ref.size} bytes), saved to {ref.path} (served at {ref.url})"
                     )
 
-                elif action == "get_html":
-                    html = await context.get_page_html()
-                    truncated = html[:2000] + "..." if len(html) > 2000 else html
-                    return ToolResult(output=truncated)
-
-                elif action == "get_text":
-                    text = await context.execute_javascript("document.body.innerText")
-                    return ToolResult(output=text)
+                elif action in ("get_html", "get_text"):
+                    chunks = await self._page_chunks(context, action)
+                    return self._read_chunks(chunks, chunk_index, query)
 
                 elif action == "read_links":
                     links = await context.execute_javascript(
@@ -241,53 +307,108 @@ class BrowserUseTool(BaseTool):
                     return ToolResult(error=f"Unknown action: {action}")
 
             except Exception as e:
+                if self.lease is not None and not self.lease.alive:
+                    self._release_context()
+                    return ToolResult(
+                        error=f"Browser action '{action}' failed: the browser context crashed ({str(e)}); a new one will be used for the next action"
+                    )
                 return ToolResult(error=f"Browser action '{action}' failed: {str(e)}")
 
-    async def get_current_state(self) -> ToolResult:
-        """Get the current browser state as a ToolResult."""
+    async def _page_chunks(self, context: BrowserContext, action: str) -> ChunkedText:
+        """Text or HTML of the current page, split into chunks once per page version."""
+        page = await context.get_current_page()
+        token = await page.evaluate(DOM_VERSION_JS)
+        key = (action, id(page), page.url, content_version(token))
+        chunks = self._page_texts.get(key)
+        if chunks is None:
+            if action == "get_html":
+                content = await context.get_page_html()
+            else:
+                content = await context.execute_javascript("document.body.innerText")
+            chunks = ChunkedText(content or "")
+            self._page_texts[key] = chunks
+            while len(self._page_texts) > MAX_CACHED_PAGES:
+                self._page_texts.popitem(last=False)
+        self._page_texts.move_to_end(key)
+        return chunks
+
+    @staticmethod
+    def _read_chunks(
+        chunks: ChunkedText, chunk_index: Optional[int], query: Optional[str]
+    ) -> ToolResult:
+        if query:
+            matches = chunks.search(query)
+            if not matches:
+                return ToolResult(
+                    output=f"No part of the page matches '{query}' (the page has {len(chunks)} chunks)"
+                )
+            return ToolResult(output="\n\n".join(chunks.render(i) for i in matches))
+
+        index = chunk_index or 0
+        if not 0 <= index < len(chunks):
+            return ToolResult(
+                error=f"chunk_index {index} is out of range: the page has {len(chunks)} chunks"
+            )
+        if len(chunks) == 1:
+            return ToolResult(output=chunks.chunk(0))
+        return ToolResult(
+            output=chunks.render(index)
+            + "\n[Use 'chunk_index' to read other chunks, or 'query' to get the most relevant ones]"
+        )
+
+    async def get_current_state(self, full: bool = False) -> ToolResult:
+        """Get the current browser state as a ToolResult.
+
+        The element tree is only rebuilt if the tab navigated, mutated or
+        scrolled since the last call; if it did not, `interactive_elements_unchanged`
+        says so. If a few interactive elements changed,
+        `interactive_elements_changes` lists just those instead of the full
+        `interactive_elements`; `full=True` always returns the full list.
+        """
         async with self.lock:
             try:
                 context = await self._ensure_browser_initialized()
-                state = await context.get_state()
+                page = await context.get_current_page()
+                token = await page.evaluate(DOM_VERSION_JS)
+                previous = self._page_states.get(id(page))
                 state_info = {
-                    "url": state.url,
-                    "title": state.title,
-                    "tabs": [tab.model_dump() for tab in state.tabs],
-                    "interactive_elements": state.element_tree.clickable_elements_to_string(),
+                    "url": page.url,
+                    "title": await page.title(),
+                    "tabs": [tab.model_dump() for tab in await context.get_tabs_info()],
                 }
+
+                if previous is not None and previous.token == token and not full:
+                    state_info["interactive_elements_unchanged"] = UNCHANGED_NOTE
+                    return ToolResult(output=json.dumps(state_info))
+
+                state = await context.get_state()
+                elements_text = state.element_tree.clickable_elements_to_string()
+                current = PageState(token, elements_text, parse_elements(elements_text))
+                self._page_states[id(page)] = current
+                state_info.update(
+                    url=state.url,
+                    title=state.title,
+                    tabs=[tab.model_dump() for tab in state.tabs],
+                )
+
+                changes = None
+                if (
+                    previous is not None
+                    and previous.document_id == current.document_id
+                    and not full
+                ):
+                    changes = element_changes(previous.elements, current.elements)
+                if changes is not None:
+                    state_info["interactive_elements_changes"] = changes
+                else:
+                    state_info["interactive_elements"] = elements_text
                 return ToolResult(output=json.dumps(state_info))
             except Exception as e:
                 return ToolResult(error=f"Failed to get browser state: {str(e)}")
 
     async def cleanup(self):
-        """清理浏览器资源"""
-        if hasattr(self, 'browser') and self.browser is not None:
-            try:
-                if hasattr(self, 'context') and self.context and not self.context.is_closed():
-                    await self.context.close()
-                if self.browser and not self.browser.is_closed():
-                    await self.browser.close()
-                self.browser = None
-                self.context = None
-                self.dom_service = None  # 修正变量名
-            except Exception as e:
-                logging.error(f"浏览器清理过程中出错: {str(e)}")
-
-    def __del__(self):
-        """在对象被销毁时尝试清理资源"""
-        if hasattr(self, 'browser') and self.browser is not None:
-            try:
-                # 检查是否有事件循环正在运行
-                try:
-                    loop = asyncio.get_running_loop()
-                    if loop.is_running():
-                        # 如果有循环在运行，记录警告并跳过(避免运行时错误)
-                        logging.warning("事件循环正在运行，跳过浏览器清理。这可能会导致资源泄漏。")
-                        return
-                except RuntimeError:
-                    # 没有事件循环在运行，可以创建新的
-                    loop = asyncio.new_event_loop()
-                    loop.run_until_complete(self.cleanup())
-                    loop.close()
-            except Exception as e:
-                logging.error(f"浏览器资源清理失败: {str(e)}")
+        """归还浏览器上下文（共享浏览器由浏览器池在事件循环结束时关闭）"""
+        try:
+            self._release_context()
+        except Exception as e:
+            logging.error(f"浏览器清理过程中出错: {str(e)}")
@@ -0,0 +1,104 @@
+"""In-process directory listing for StrReplaceEditor's `view` of a directory."""
+
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+
+MAX_DEPTH: int = 2
+MAX_ENTRIES: int = 1000
+MAX_CACHED_LISTINGS: int = 64
+
+
+@dataclass
+class Listing:
+    """Output of a walk, in the format of `find <root> -maxdepth 2 -not -path '*/\\.*'`."""
+
+    output: str
+    errors: str = ""
+    # Directory -> mtime_ns of every directory that was read
+    mtimes: Dict[str, int] = field(default_factory=dict)
+
+    def is_current(self) -> bool:
+        """Entries are added, removed or renamed only if a directory's mtime changes."""
+        try:
+            return all(
+                os.stat(directory).st_mtime_ns == mtime
+                for directory, mtime in self.mtimes.items()
+            )
+        except OSError:
+            return False
+
+
+def _walk(root: str, max_depth: int, max_entries: int) -> Listing:
+    # Breadth first, so that the entry cap cuts the deepest levels and not the
+    # last top-level entries
+    children: Dict[str, List[str]] = {}
+    errors: List[str] = []
+    mtimes: Dict[str, int] = {}
+    count = 0
+    truncated = False
+    level = [root]
+    for depth in range(1, max_depth + 1):
+        next_level = []
+        for directory in level:
+            try:
+                mtimes[directory] = os.stat(directory).st_mtime_ns
+                with os.scandir(directory) as it:
+                    entries = sorted(
+                        (entry for entry in it if not entry.name.startswith(".")),
+                        key=lambda entry: entry.name,
+                    )
+            except OSError as e:
+                errors.append(f"find: '{directory}': {e.strerror}")
+                continue
+            if count + len(entries) > max_entries:
+                entries = entries[: max_entries - count]
+                truncated = True
+            count += len(entries)
+            children[directory] = [entry.path for entry in entries]
+            if depth < max_depth:
+                next_level.extend(
+                    entry.path
+                    for entry in entries
+                    if entry.is_dir(follow_symlinks=False)
+                )
+            if truncated:
+                break
+        if truncated:
+            break
+        level = next_level
+
+    lines: List[str] = []
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        lines.append(path)
+        stack.extend(reversed(children.get(path, [])))
+    if truncated:
+        lines.append(
+            f"<listing truncated after {max_entries} entries; view a subdirectory to see more>"
+        )
+    return Listing("\n".join(lines) + "\n", "\n".join(errors), mtimes)
+
+
+_listings: "OrderedDict[Tuple[str, int, int], Listing]" = OrderedDict()
+
+
+def list_directory(
+    path: str, max_depth: int = MAX_DEPTH, max_entries: int = MAX_ENTRIES
+) -> Listing:
+    """Non-hidden files and directories up to `max_depth` levels below `path`.
+
+    Listings are cached and reused until a directory they read changes.
+    """
+    key = (path, max_depth, max_entries)
+    listing = _listings.get(key)
+    if listing is None or not listing.is_current():
+        listing = _walk(path, max_depth, max_entries)
+        _listings[key] = listing
+    _listings.move_to_end(key)
+    while len(_listings) > MAX_CACHED_LISTINGS:
+        _listings.popitem(last=False)
+    return listing
@@ -0,0 +1,101 @@
+"""Change tracking for BrowserUseTool's page state.
+
+A script in the page counts DOM mutations and scrolls, so an unchanged page
+can reuse the last state instead of rebuilding the element tree, and a page
+that changed a little can be described by a diff of its interactive elements.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+# Returns "<document id>:<mutations>:<scrolls>". The id changes with every new
+# document (navigation, reload); the counters with every DOM mutation and
+# scroll. Mutations made by browser_use's own element highlighting are not
+# counted.
+DOM_VERSION_JS = """() => {
+    if (!window.__openmanusDomState) {
+        const state = {id: Math.random().toString(36).slice(2), mutations: 0, scrolls: 0};
+        const HIGHLIGHT = 'playwright-highlight-container';
+        const isHighlight = (node) => {
+            const el = node && (node.nodeType === 1 ? node : node.parentElement);
+            return !!(el && (el.id === HIGHLIGHT || el.closest('#' + HIGHLIGHT)));
+        };
+        new MutationObserver((records) => {
+            for (const r of records) {
+                if (r.type === 'attributes' && (r.attributeName || '').startsWith('browser-user-highlight')) continue;
+                if (isHighlight(r.target)) continue;
+                if (r.type === 'childList' && [...r.addedNodes, ...r.removedNodes].every(isHighlight)) continue;
+                state.mutations++;
+                return;
+            }
+        }).observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+        window.addEventListener('scroll', () => { state.scrolls++; }, {capture: true, passive: true});
+        window.__openmanusDomState = state;
+    }
+    const state = window.__openmanusDomState;
+    return state.id + ':' + state.mutations + ':' + state.scrolls;
+}"""
+
+# Share of the elements that may change before the full list is sent again
+MAX_CHANGED_RATIO = 0.3
+
+# Sent instead of the elements when the page did not change at all
+UNCHANGED_NOTE = (
+    "The page has not changed since the previous state: same interactive "
+    "elements, with the same indices"
+)
+
+_INDEX_RE = re.compile(r"^\s*\*?\[(\d+)\]")
+
+
+@dataclass
+class PageState:
+    token: str  # DOM_VERSION_JS result the state was built at
+    elements_text: str
+    elements: Dict[int, str]
+
+    @property
+    def document_id(self) -> str:
+        return self.token.split(":")[0]
+
+
+def content_version(token: str) -> str:
+    """The part of a DOM_VERSION_JS token that changes with the page content
+    (scrolling leaves it alone)."""
+    return token.rsplit(":", 1)[0]
+
+
+def parse_elements(text: str) -> Dict[int, str]:
+    """Split `clickable_elements_to_string()` output into index -> element
+    line plus the text lines that follow it."""
+    elements: Dict[int, str] = {}
+    current: Optional[int] = None
+    for line in text.split("\n"):
+        match = _INDEX_RE.match(line)
+        if match:
+            current = int(match.group(1))
+            elements[current] = line
+        elif current is not None:
+            elements[current] += "\n" + line
+    return elements
+
+
+def element_changes(old: Dict[int, str], new: Dict[int, str]) -> Optional[dict]:
+    """Elements added, changed or removed since `old`, or None if too much
+    changed for a diff to help.
+
+    Unchanged elements keep their index, so indices the agent already knows
+    stay valid.
+    """
+    changed = [index for index, element in new.items() if old.get(index) != element]
+    removed = [index for index in old if index not in new]
+    if len(changed) + len(removed) > max(5, MAX_CHANGED_RATIO * len(new)):
+        return None
+    return {
+        "unchanged_count": len(new) - len(changed),
+        "added_or_changed": "\n".join(new[index] for index in changed),
+        "removed_indices": removed,
+        "note": "Elements not listed are unchanged since the previous state, with the same indices",
+    }
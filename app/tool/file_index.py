@@ -0,0 +1,173 @@
+"""Line-offset indexes for reading and editing large files without loading them.
+
+The index keeps one checkpoint per block (byte offset, newlines before it), so
+locating a line means a binary search plus a scan of a single block. Indexes
+are cached per path and rebuilt when the file's (inode, mtime, size) changes.
+"""
+
+import bisect
+import codecs
+import locale
+import mmap
+import os
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+BLOCK_SIZE: int = 16 * 1024
+MAX_CACHED_INDEXES: int = 32
+
+
+class LineIndex:
+    """Sparse newline index of one version of a file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._block_newlines: List[int] = []  # newlines before each block
+        newlines = 0
+        self.has_cr = False
+        self.has_tab = False
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            while block := f.read(BLOCK_SIZE):
+                self._block_newlines.append(newlines)
+                newlines += block.count(b"\n")
+                self.has_cr = self.has_cr or b"\r" in block
+                self.has_tab = self.has_tab or b"\t" in block
+        self.size = stat.st_size
+        self.newlines = newlines
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines as `text.split("\\n")` counts them."""
+        return self.newlines + 1
+
+    @property
+    def plain(self) -> bool:
+        """Bytes map to the text `Path.read_text()` returns, line for line.
+
+        Needs UTF-8 as the default encoding and no `\\r` (universal newlines
+        would translate it).
+        """
+        return not self.has_cr and _default_encoding_is_utf8()
+
+    def line_start(self, line: int) -> int:
+        """Byte offset where 1-based `line` starts."""
+        with open(self.path, "rb") as f, _map(f) as mm:
+            return self._line_start(mm, line)
+
+    def line_of(self, offset: int) -> int:
+        """0-based number of the line containing byte `offset`."""
+        block = offset // BLOCK_SIZE
+        with open(self.path, "rb") as f, _map(f) as mm:
+            return self._block_newlines[block] + mm[block * BLOCK_SIZE : offset].count(
+                b"\n"
+            )
+
+    def find(self, needle: bytes, limit: int = 2) -> List[int]:
+        """Offsets of the first `limit` non-overlapping occurrences of `needle`."""
+        found: List[int] = []
+        with open(self.path, "rb") as f, _map(f) as mm:
+            pos = mm.find(needle)
+            while pos >= 0 and len(found) < limit:
+                found.append(pos)
+                pos = mm.find(needle, pos + max(len(needle), 1))
+        return found
+
+    def read_lines(self, first: int, last: int) -> str:
+        """Text of 1-based lines `first`..`last` (-1 for end of file), as
+        `"\\n".join(lines[first - 1 : last])` would give."""
+        with open(self.path, "rb") as f, _map(f) as mm:
+            start = self._line_start(mm, first)
+            if last == -1 or last >= self.line_count:
+                end = len(mm)
+            else:
+                end = self._line_start(mm, last + 1) - 1
+            return mm[start:end].decode()
+
+    def _line_start(self, mm: mmap.mmap, line: int) -> int:
+        if line <= 1:
+            return 0
+        target = line - 1  # newlines that precede the line
+        block = bisect.bisect_left(self._block_newlines, target) - 1
+        pos = block * BLOCK_SIZE
+        for _ in range(target - self._block_newlines[block]):
+            pos = mm.find(b"\n", pos) + 1
+        return pos
+
+
+def _default_encoding_is_utf8() -> bool:
+    return codecs.lookup(locale.getpreferredencoding(False)).name == "utf-8"
+
+
+def _map(f) -> mmap.mmap:
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+_indexes: "OrderedDict[Path, LineIndex]" = OrderedDict()
+
+
+def get_line_index(path: Path) -> LineIndex:
+    """The index of the current version of `path`, built or reused."""
+    stat = path.stat()
+    key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    index = _indexes.get(path)
+    if index is None or index.key != key:
+        index = LineIndex(path)
+        _indexes[path] = index
+    _indexes.move_to_end(path)
+    while len(_indexes) > MAX_CACHED_INDEXES:
+        _indexes.popitem(last=False)
+    return index
+
+
+def read_head(path: Path, chars: int) -> Optional[str]:
+    """At least the first `chars` characters of a file (fewer only at EOF), or
+    None if they can't be read without decoding the whole file."""
+    if not _default_encoding_is_utf8():
+        return None
+    with open(path, "rb") as f:
+        data = f.read(chars * 4 + 4)
+    if b"\r" in data:
+        return None
+    # An incremental decoder leaves out a character cut at the boundary
+    return codecs.getincrementaldecoder("utf-8")().decode(data)
+
+
+def read_span(path: Path, start: int, end: int, lines_after: int) -> str:
+    """Text from byte `start` to the end of the line `lines_after` lines below
+    the one containing byte `end`."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with _map(f) as mm:
+            stop = end - 1
+            for _ in range(lines_after + 1):
+                stop = mm.find(b"\n", stop + 1)
+                if stop < 0:
+                    stop = len(mm)
+                    break
+            return mm[start:stop].decode()
+
+
+def splice(path: Path, offset: int, remove: int, data: bytes) -> Tuple[bytes, int, int]:
+    """Replace `remove` bytes at `offset` with `data`, rewriting only what follows.
+
+    Returns the removed bytes, the new file size and the CRC-32 of the new
+    content.
+    """
+    with open(path, "r+b") as f:
+        with _map(f) as mm:
+            removed = mm[offset : offset + remove]
+            tail = mm[offset + remove :]
+            with memoryview(mm) as view:
+                crc = zlib.crc32(view[:offset])
+        crc = zlib.crc32(tail, zlib.crc32(data, crc))
+        f.seek(offset)
+        f.write(data)
+        f.write(tail)
+        f.truncate()
+    return removed, offset + len(data) + len(tail), crc
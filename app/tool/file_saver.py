@@ -1,8 +1,9 @@
 import os
+from typing import Optional
 
 import aiofiles
 
-from app.tool.base import BaseTool
+from app.tool.base import BaseTool, file_resource
 
 
 class FileSaver(BaseTool):
@@ -32,6 +33,10 @@ The tool accepts content and a file path, and saves the content to that location
         "required": ["content", "file_path"],
     }
 
+    def concurrency_key(self, file_path: str = "", **kwargs) -> Optional[str]:
+        """Writes to different files can run in parallel."""
+        return file_resource(file_path)
+
     async def execute(self, content: str, file_path: str, mode: str = "w") -> str:
         """
         Save content to a file at the specified path.
@@ -0,0 +1,33 @@
+"""Child process that extracts the text of web pages for WebFetch.
+
+Runs as a standalone script (it must not import `app`). Requests and replies
+are JSON lines: {"html": str} -> {"text": str} or {"error": str}.
+"""
+
+import json
+import sys
+
+import html2text
+
+
+def html_to_text(html: str) -> str:
+    """Main text of a page as markdown, without links and images."""
+    converter = html2text.HTML2Text()
+    converter.ignore_links = True
+    converter.ignore_images = True
+    converter.body_width = 0
+    return converter.handle(html)
+
+
+def main() -> None:
+    for line in sys.stdin:
+        try:
+            reply = {"text": html_to_text(json.loads(line)["html"])}
+        except Exception as e:
+            reply = {"error": f"{type(e).__name__}: {e}"}
+        sys.stdout.write(json.dumps(reply) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
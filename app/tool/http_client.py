@@ -0,0 +1,28 @@
+"""Shared asyncio HTTP client for the web tools."""
+
+import asyncio
+import weakref
+
+import httpx
+
+
+# Connections are kept alive and reused across tool calls and sessions
+HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+HTTP_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+
+# httpx connection pools belong to the event loop that opened them
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The pooled client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT, follow_redirects=True
+        )
+        _clients[loop] = client
+    return client
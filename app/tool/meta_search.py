@@ -0,0 +1,115 @@
+import asyncio
+from typing import Dict, List, Type
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from pydantic import Field
+
+from app.logger import logger
+from app.tool.baidu_search import BaiduSearch
+from app.tool.base import BaseTool
+from app.tool.bing_search import BingSearch
+from app.tool.google_search import GoogleSearch
+
+
+SEARCH_ENGINES: Dict[str, Type[BaseTool]] = {
+    "bing": BingSearch,
+    "baidu": BaiduSearch,
+    "google": GoogleSearch,
+}
+
+
+def normalize_url(url: str) -> str:
+    """Key under which equivalent result URLs are deduplicated.
+
+    Scheme, `www.`, fragment, trailing slash and `utm_*` tracking parameters
+    don't make a different page.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(
+        [
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.startswith("utm_")
+        ]
+    )
+    return urlunsplit(("", host, parts.path.rstrip("/"), query, ""))
+
+
+class MetaSearch(BaseTool):
+    name: str = "meta_search"
+    description: str = """Perform a web search across several search engines at once and return a list of relevant links.
+Use this tool when you need to find information on the web, get up-to-date data, or research specific topics.
+The tool returns a list of URLs that match the search query.
+"""
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "(required) The search query to submit to the search engines.",
+            },
+            "num_results": {
+                "type": "integer",
+                "description": "(optional) The number of search results to return. Default is 10.",
+                "default": 10,
+            },
+        },
+        "required": ["query"],
+    }
+    speculative_safe: bool = True
+    concurrency_safe: bool = True
+
+    engines: List[BaseTool] = Field(
+        default_factory=lambda: [engine() for engine in SEARCH_ENGINES.values()]
+    )
+    deadline: float = Field(5.0, description="Seconds to wait for slow engines")
+
+    async def execute(self, query: str, num_results: int = 10) -> List[str]:
+        """
+        Query all engines concurrently and merge their results.
+
+        Results are taken in the order engines answer, deduplicated by
+        `normalize_url`. Returns as soon as `num_results` unique URLs are in or
+        `deadline` seconds have passed, with whatever has arrived by then.
+
+        Args:
+            query (str): The search query to submit.
+            num_results (int, optional): The number of search results to return. Default is 10.
+
+        Returns:
+            List[str]: A list of URLs matching the search query.
+        """
+        tasks = [
+            asyncio.create_task(engine.execute(query=query, num_results=num_results))
+            for engine in self.engines
+        ]
+        links: List[str] = []
+        seen = set()
+        try:
+            async with asyncio.timeout(self.deadline):
+                for next_done in asyncio.as_completed(tasks):
+                    try:
+                        results = await next_done
+                    except Exception as e:
+                        logger.warning(f"Search engine failed for '{query}': {e}")
+                        continue
+                    for url in results or []:
+                        key = normalize_url(url)
+                        if url.startswith("http") and key not in seen:
+                            seen.add(key)
+                            links.append(url)
+                    if len(links) >= num_results:
+                        break
+        except TimeoutError:
+            logger.info(
+                f"Search deadline of {self.deadline}s passed for '{query}', "
+                f"returning {len(links)} results"
+            )
+        finally:
+            # Engines running in executor threads finish in the background
+            for task in tasks:
+                task.cancel()
+        return links[:num_results]
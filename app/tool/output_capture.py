@@ -0,0 +1,128 @@
+"""Bounded capture of command output, spilling large outputs to the workspace."""
+
+import time
+import uuid
+from contextvars import ContextVar
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional
+
+from app.logger import logger
+from app.tool.artifact_store import current_workspace
+
+
+MAX_CAPTURE_BYTES: int = 16000
+PROGRESS_INTERVAL: float = 1.0  # seconds
+PROGRESS_CHARS: int = 1000
+
+# Receives (source, recent output) while a command is running. The web app sets
+# this per session to stream progress to the browser.
+output_progress: ContextVar[Optional[Callable[[str, str], None]]] = ContextVar(
+    "output_progress", default=None
+)
+
+
+def spill_dir() -> Path:
+    """Where full outputs are saved: the current job workspace, if any."""
+    return current_workspace() / ".tool_outputs"
+
+
+class OutputCapture:
+    """Captures a stream with memory bounded by `limit` bytes.
+
+    Output up to `limit` bytes is kept as is. Beyond that only the first and
+    last `limit // 2` bytes stay in memory, and the complete output is written
+    to a file under `spill_dir()` that the agent can page through.
+    """
+
+    def __init__(
+        self,
+        name: str = "output",
+        limit: Optional[int] = MAX_CAPTURE_BYTES,
+        progress: Optional[Callable[[str, str], None]] = None,
+    ):
+        self.name = name
+        self.limit = limit
+        self.total = 0
+        self.spill_path: Optional[Path] = None
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._overflowed = False
+        self._spill: Optional[BinaryIO] = None
+        self._progress = progress or output_progress.get()
+        self._last_progress = time.monotonic()
+
+    @property
+    def overflowed(self) -> bool:
+        return self._overflowed
+
+    def feed(self, data: bytes) -> None:
+        if not data:
+            return
+        self.total += len(data)
+        if not self._overflowed:
+            self._head.extend(data)
+            if self.limit is not None and len(self._head) > self.limit:
+                self._overflow()
+        else:
+            if self._spill is not None:
+                self._spill.write(data)
+            self._tail.extend(data)
+            excess = len(self._tail) - self.limit // 2
+            if excess > 0:
+                del self._tail[:excess]
+        self._report()
+
+    def _overflow(self) -> None:
+        self._overflowed = True
+        try:
+            directory = spill_dir()
+            directory.mkdir(parents=True, exist_ok=True)
+            self.spill_path = directory / f"{self.name}_{uuid.uuid4().hex[:8]}.log"
+            self._spill = open(self.spill_path, "wb")
+            self._spill.write(self._head)
+        except OSError as e:
+            logger.warning(f"Could not save full {self.name} output: {e}")
+            self.spill_path = None
+            self._spill = None
+        half = self.limit // 2
+        self._tail = self._head[-half:] if half else bytearray()
+        del self._head[half:]
+
+    def _report(self) -> None:
+        if self._progress is None:
+            return
+        now = time.monotonic()
+        if now - self._last_progress < PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        recent = (self._tail if self._overflowed else self._head)[-PROGRESS_CHARS:]
+        try:
+            self._progress(self.name, recent.decode(errors="replace"))
+        except Exception as e:
+            logger.debug(f"Output progress callback failed: {e}")
+
+    def close(self) -> None:
+        """Finish writing the spill file."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def text(self) -> str:
+        """The captured output, clipped in the middle if it overflowed."""
+        self.close()
+        if not self._overflowed:
+            return self._head.decode(errors="replace")
+        omitted = self.total - len(self._head) - len(self._tail)
+        if self.spill_path is not None:
+            notice = (
+                f"<response clipped: {omitted} bytes omitted. The full output "
+                f"({self.total} bytes) was saved to {self.spill_path}; use "
+                "`grep -n` or `sed -n` on that file to see the rest.>"
+            )
+        else:
+            notice = f"<response clipped: {omitted} bytes omitted>"
+        return (
+            self._head.decode(errors="replace")
+            + f"\n{notice}\n"
+            + self._tail.decode(errors="replace")
+        )
@@ -0,0 +1,84 @@
+"""Chunked page text for BrowserUseTool's `get_text` and `get_html`.
+
+A page's text is split once into chunks at line boundaries; the agent reads
+chunk k, or asks for the chunks that best match a query (BM25).
+"""
+
+import math
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+
+CHUNK_CHARS: int = 4000
+MAX_QUERY_CHUNKS: int = 3
+MAX_CACHED_PAGES: int = 8  # per tool
+
+# Latin words and digits, and CJK characters one by one
+_TOKEN_RE = re.compile(
+    r"[a-z0-9]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]"
+)
+_BM25_K1 = 1.5
+_BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class ChunkedText:
+    """Text split into chunks of about `chunk_chars`, cut at line ends where possible."""
+
+    def __init__(self, text: str, chunk_chars: int = CHUNK_CHARS):
+        self.text = text
+        self.offsets: List[Tuple[int, int]] = []
+        start = 0
+        while start < len(text) or not self.offsets:
+            end = min(start + chunk_chars, len(text))
+            if end < len(text):
+                newline = text.rfind("\n", start + chunk_chars // 2, end)
+                if newline >= 0:
+                    end = newline + 1
+            self.offsets.append((start, end))
+            start = end
+        self._term_counts: Optional[List[Counter]] = None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def chunk(self, index: int) -> str:
+        start, end = self.offsets[index]
+        return self.text[start:end]
+
+    def search(self, query: str, limit: int = MAX_QUERY_CHUNKS) -> List[int]:
+        """Indices of the chunks ranking highest for `query` by BM25, best first."""
+        if self._term_counts is None:
+            # Indexed on the first search only; plain paging never needs it
+            self._term_counts = [
+                Counter(tokenize(self.chunk(i))) for i in range(len(self))
+            ]
+        lengths = [sum(counts.values()) for counts in self._term_counts]
+        average = (sum(lengths) / len(lengths)) or 1.0
+        scores = [0.0] * len(self)
+        for term in set(tokenize(query)):
+            frequency = sum(1 for counts in self._term_counts if term in counts)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(self) - frequency + 0.5) / (frequency + 0.5))
+            for i, counts in enumerate(self._term_counts):
+                tf = counts.get(term, 0)
+                if tf:
+                    norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * lengths[i] / average)
+                    scores[i] += idf * tf * (_BM25_K1 + 1) / (tf + norm)
+        ranked = sorted(
+            (i for i in range(len(self)) if scores[i] > 0), key=lambda i: -scores[i]
+        )
+        return ranked[:limit]
+
+    def render(self, index: int) -> str:
+        """Chunk `index` with a header saying where it is in the page."""
+        start, end = self.offsets[index]
+        return (
+            f"[chunk {index} of {len(self)}, characters {start}-{end} of "
+            f"{len(self.text)}]\n{self.chunk(index)}"
+        )
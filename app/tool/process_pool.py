@@ -0,0 +1,108 @@
+"""Pools of pre-started child processes (shells, interpreters) for tools."""
+
+import asyncio
+import weakref
+from typing import Awaitable, Callable, Generic, List, Optional, Protocol, TypeVar
+
+from app.logger import logger
+
+
+class PooledProcess(Protocol):
+    @property
+    def alive(self) -> bool:
+        ...
+
+    def kill(self) -> None:
+        ...
+
+    async def wait(self) -> None:
+        ...
+
+
+T = TypeVar("T", bound=PooledProcess)
+
+
+class WarmPool(Generic[T]):
+    """Keeps `size` started processes ready to be checked out.
+
+    Checked-out processes are owned by the caller and never come back: when
+    the caller is done (or the process hangs or dies) it is discarded and a
+    background task tops the pool up again. The same task re-checks idle
+    processes every `recycle_interval` seconds, and kills every process the
+    pool started when the event loop shuts down.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Awaitable[T]],
+        size: int = 2,
+        recycle_interval: float = 30.0,
+    ):
+        self.factory = factory
+        self.size = size
+        self.recycle_interval = recycle_interval
+        self._idle: List[T] = []
+        self._started: "weakref.WeakSet[T]" = weakref.WeakSet()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._maintainer: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    async def acquire(self, factory: Optional[Callable[[], Awaitable[T]]] = None) -> T:
+        """Check out a warm process, or start one with `factory` if none is ready."""
+        self._bind_loop()
+        item = None
+        while self._idle and item is None:
+            candidate = self._idle.pop()
+            if candidate.alive:
+                item = candidate
+        if item is None:
+            item = await (factory or self.factory)()
+            self._started.add(item)
+        self._wake.set()
+        return item
+
+    def discard(self, item: T) -> None:
+        """Kill a checked-out process; the pool refills in the background."""
+        item.kill()
+        if self._wake is not None and not self._loop.is_closed():
+            self._wake.set()
+
+    def _bind_loop(self) -> None:
+        # Subprocess transports belong to the loop that created them
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and not self._maintainer.done():
+            return
+        for item in self._idle:
+            item.kill()
+        self._idle = []
+        self._loop = loop
+        self._wake = asyncio.Event()
+        self._maintainer = asyncio.create_task(self._maintain())
+
+    async def _maintain(self) -> None:
+        try:
+            while True:
+                self._idle = [item for item in self._idle if item.alive]
+                while len(self._idle) < self.size:
+                    item = await self.factory()
+                    self._started.add(item)
+                    self._idle.append(item)
+                self._wake.clear()
+                # Not wait_for: on 3.11 it can swallow a cancellation that
+                # arrives as the event is set, and shutdown would hang
+                try:
+                    async with asyncio.timeout(self.recycle_interval):
+                        await self._wake.wait()
+                except TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            # Event loop is shutting down: don't leave processes behind
+            items = list(self._started)
+            for item in items:
+                item.kill()
+            await asyncio.gather(
+                *(item.wait() for item in items), return_exceptions=True
+            )
+            raise
+        except Exception as e:
+            logger.error(f"Failed to start pooled process: {e}")
@@ -1,11 +1,21 @@
-import threading
-from typing import Dict
+import asyncio
+import weakref
+from typing import Dict, Optional
 
+from pydantic import PrivateAttr
+
+from app.tool.artifact_store import current_workspace
 from app.tool.base import BaseTool
+from app.tool.python_kernel import PythonWorker, PythonWorkerError, get_worker_pool
 
 
 class PythonExecute(BaseTool):
-    """A tool for executing Python code with timeout and safety restrictions."""
+    """A tool for executing Python code with timeout and safety restrictions.
+
+    Code runs in a separate interpreter taken from a warm pool. Each tool
+    instance keeps its interpreter, so variables persist between calls; on
+    timeout the interpreter is killed and the next call starts fresh.
+    """
 
     name: str = "python_execute"
     description: str = "Executes Python code string. Note: Only print outputs are visible, function return values are not captured. Use print statements to see results."
@@ -20,6 +30,9 @@ class PythonExecute(BaseTool):
         "required": ["code"],
     }
 
+    _worker: Optional[PythonWorker] = PrivateAttr(default=None)
+    _finalizer: Optional[weakref.finalize] = PrivateAttr(default=None)
+
     async def execute(
         self,
         code: str,
@@ -35,36 +48,40 @@ class PythonExecute(BaseTool):
         Returns:
             Dict: Contains 'output' with execution output or error message and 'success' status.
         """
-        result = {"observation": ""}
-
-        def run_code():
-            try:
-                safe_globals = {"__builtins__": dict(__builtins__)}
-
-                import sys
-                from io import StringIO
-
-                output_buffer = StringIO()
-                sys.stdout = output_buffer
-
-                exec(code, safe_globals, {})
-
-                sys.stdout = sys.__stdout__
-
-                result["observation"] = output_buffer.getvalue()
-
-            except Exception as e:
-                result["observation"] = str(e)
-                result["success"] = False
-
-        thread = threading.Thread(target=run_code)
-        thread.start()
-        thread.join(timeout)
-
-        if thread.is_alive():
+        worker = await self._get_worker()
+        # The worker is shared across calls, so it is pointed at the session's
+        # workspace each time rather than inheriting the process's cwd
+        workspace = current_workspace()
+        workspace.mkdir(parents=True, exist_ok=True)
+        try:
+            return await asyncio.wait_for(
+                worker.execute(code, cwd=str(workspace)), timeout
+            )
+        except asyncio.TimeoutError:
+            self._discard_worker()
             return {
                 "observation": f"Execution timeout after {timeout} seconds",
                 "success": False,
             }
-
-        return result
+        except PythonWorkerError as e:
+            self._discard_worker()
+            return {"observation": str(e), "success": False}
+
+    async def _get_worker(self) -> PythonWorker:
+        if self._worker is None or not self._worker.alive:
+            # If nothing is warm, start a bare interpreter rather than wait for
+            # the preloads
+            self._worker = await get_worker_pool().acquire(PythonWorker.start)
+            # Don't leave the interpreter running once the tool is gone
+            self._finalizer = weakref.finalize(self, self._worker.kill)
+        return self._worker
+
+    def _discard_worker(self) -> None:
+        if self._worker is not None:
+            self._finalizer.detach()
+            get_worker_pool().discard(self._worker)
+            self._worker = None
+
+    async def cleanup(self) -> None:
+        """Stop this tool's interpreter."""
+        self._discard_worker()
@@ -0,0 +1,84 @@
+"""Pre-started Python interpreters that back PythonExecute."""
+
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Optional, Sequence
+
+from app.tool.process_pool import WarmPool
+
+
+_WORKER_SCRIPT = str(Path(__file__).with_name("python_worker.py"))
+# Replies carry the whole printed output on one line
+_STREAM_LIMIT = 64 * 1024 * 1024
+# Imported by warm workers before they are handed out
+PRELOAD_MODULES = ("json", "math", "re", "numpy", "pandas")
+
+
+class PythonWorkerError(Exception):
+    """The worker interpreter died or replied with garbage."""
+
+
+class PythonWorker:
+    """One child interpreter with persistent globals."""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def start(cls, preload: Sequence[str] = ()) -> "PythonWorker":
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-u",
+            _WORKER_SCRIPT,
+            *preload,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=_STREAM_LIMIT,
+        )
+        return cls(process)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def execute(self, code: str, cwd: Optional[str] = None) -> dict:
+        """Run `code` in the worker and return its reply."""
+        async with self._lock:
+            request = json.dumps({"code": code, "cwd": cwd or os.getcwd()})
+            try:
+                self.process.stdin.write(request.encode() + b"\n")
+                await self.process.stdin.drain()
+                line = await self.process.stdout.readline()
+            except (ConnectionError, ValueError) as e:
+                self.kill()
+                raise PythonWorkerError(str(e)) from e
+            if not line:
+                self.kill()
+                raise PythonWorkerError("Python worker exited unexpectedly")
+            return json.loads(line)
+
+    def kill(self) -> None:
+        if self.alive:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+
+    async def wait(self) -> None:
+        await self.process.wait()
+
+
+_pool: Optional[WarmPool[PythonWorker]] = None
+
+
+def get_worker_pool() -> WarmPool[PythonWorker]:
+    """The process-wide pool of warm interpreters."""
+    global _pool
+    if _pool is None:
+        _pool = WarmPool(lambda: PythonWorker.start(PRELOAD_MODULES))
+    return _pool
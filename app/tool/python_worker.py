@@ -0,0 +1,64 @@
+"""Child interpreter used by PythonExecute.
+
+Runs as a standalone script (it must not import `app`). Requests and replies
+are JSON lines: {"code": str, "cwd": str} -> {"observation": str, "success": bool}.
+Globals persist between requests so variables survive across tool calls.
+"""
+
+import builtins
+import contextlib
+import importlib
+import io
+import json
+import os
+import sys
+
+
+def main() -> None:
+    # Keep private copies of the real stdin/stdout for the protocol. fd 1 points
+    # at stderr so output written straight to the fd (os.system, C extensions)
+    # cannot corrupt the replies, and user code sees an empty stdin (input(),
+    # and exit() which closes sys.stdin, must not touch the request stream).
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    protocol = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    sys.stdin = open(0, closefd=False)
+
+    for module in sys.argv[1:]:
+        try:
+            importlib.import_module(module)
+        except Exception:
+            pass
+
+    namespace = {"__builtins__": builtins, "__name__": "__main__"}
+    for line in requests:
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        reply = run(request, namespace)
+        protocol.write(json.dumps(reply) + "\n")
+        protocol.flush()
+
+
+def run(request: dict, namespace: dict) -> dict:
+    output = io.StringIO()
+    try:
+        if request.get("cwd"):
+            os.chdir(request["cwd"])
+        with contextlib.redirect_stdout(output):
+            exec(request.get("code", ""), namespace)
+    except SystemExit as e:
+        return {
+            "observation": output.getvalue() + f"SystemExit: {e.code}",
+            "success": False,
+        }
+    except Exception as e:
+        return {"observation": str(e), "success": False}
+    return {"observation": output.getvalue(), "success": True}
+
+
+if __name__ == "__main__":
+    main()
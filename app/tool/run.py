@@ -2,6 +2,8 @@
 
 import asyncio
 
+from app.tool.output_capture import OutputCapture
+
 
 TRUNCATED_MESSAGE: str = "<response clipped><NOTE>To save on context only part of this file has been shown to you. You should retry this tool after you have searched inside the file with `grep -n` in order to find the line numbers of what you are looking for.</NOTE>"
 MAX_RESPONSE_LEN: int = 16000
@@ -16,23 +18,37 @@ def maybe_truncate(content: str, truncate_after: int | None = MAX_RESPONSE_LEN):
     )
 
 
+async def _drain(stream: asyncio.StreamReader, capture: OutputCapture):
+    while chunk := await stream.read(64 * 1024):
+        capture.feed(chunk)
+
+
 async def run(
     cmd: str,
     timeout: float | None = 120.0,  # seconds
     truncate_after: int | None = MAX_RESPONSE_LEN,
 ):
-    """Run a shell command asynchronously with a timeout."""
+    """Run a shell command asynchronously with a timeout.
+
+    At most `truncate_after` bytes of each stream are held in memory; longer
+    output keeps its head and tail and is saved in full to a workspace file.
+    """
     process = await asyncio.create_subprocess_shell(
         cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
     )
+    stdout = OutputCapture("stdout", limit=truncate_after)
+    stderr = OutputCapture("stderr", limit=truncate_after)
 
     try:
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
-        return (
-            process.returncode or 0,
-            maybe_truncate(stdout.decode(), truncate_after=truncate_after),
-            maybe_truncate(stderr.decode(), truncate_after=truncate_after),
+        await asyncio.wait_for(
+            asyncio.gather(
+                _drain(process.stdout, stdout),
+                _drain(process.stderr, stderr),
+                process.wait(),
+            ),
+            timeout=timeout,
         )
+        return (process.returncode or 0, stdout.text(), stderr.text())
     except asyncio.TimeoutError as exc:
         try:
             process.kill()
@@ -41,3 +57,6 @@ async def run(
         raise TimeoutError(
             f"Command '{cmd}' timed out after {timeout} seconds"
         ) from exc
+    finally:
+        stdout.close()
+        stderr.close()
@@ -1,11 +1,14 @@
-from collections import defaultdict
 from pathlib import Path
-from typing import Literal, get_args
+from typing import Literal, Optional, get_args
+
+from pydantic import PrivateAttr
 
 from app.exceptions import ToolError
 from app.tool import BaseTool
-from app.tool.base import CLIResult, ToolResult
-from app.tool.run import run
+from app.tool.base import CLIResult, ToolResult, file_resource
+from app.tool.dir_listing import list_directory
+from app.tool.file_index import LineIndex, get_line_index, read_head, read_span, splice
+from app.tool.undo_history import UndoHistory
 
 
 Command = Literal[
@@ -19,6 +22,9 @@ SNIPPET_LINES: int = 4
 
 MAX_RESPONSE_LEN: int = 16000
 
+# Files at least this big are viewed by line range and edited in place
+LARGE_FILE_BYTES: int = 1024 * 1024
+
 TRUNCATED_MESSAGE: str = "<response clipped><NOTE>To save on context only part of this file has been shown to you. You should retry this tool after you have searched inside the file with `grep -n` in order to find the line numbers of what you are looking for.</NOTE>"
 
 _STR_REPLACE_EDITOR_DESCRIPTION = """Custom editing tool for viewing, creating and editing files
@@ -86,7 +92,12 @@ class StrReplaceEditor(BaseTool):
         "required": ["command", "path"],
     }
 
-    _file_history: list = defaultdict(list)
+    # Per-instance undo stacks, stored as reverse diffs under a shared byte budget
+    _file_history: UndoHistory = PrivateAttr(default_factory=UndoHistory)
+
+    def concurrency_key(self, path: str = "", **kwargs) -> Optional[str]:
+        """Edits to the same file must not interleave."""
+        return file_resource(path)
 
     async def execute(
         self,
@@ -108,7 +119,7 @@ class StrReplaceEditor(BaseTool):
             if file_text is None:
                 raise ToolError("Parameter `file_text` is required for command: create")
             self.write_file(_path, file_text)
-            self._file_history[_path].append(file_text)
+            self._file_history.record(_path, file_text, file_text)
             result = ToolResult(output=f"File created successfully at: {_path}")
         elif command == "str_replace":
             if old_str is None:
@@ -166,22 +177,24 @@ class StrReplaceEditor(BaseTool):
                     "The `view_range` parameter is not allowed when `path` points to a directory."
                 )
 
-            _, stdout, stderr = await run(
-                rf"find {path} -maxdepth 2 -not -path '*/\.*'"
-            )
+            listing = list_directory(str(path))
+            stdout, stderr = listing.output, listing.errors
             if not stderr:
                 stdout = f"Here's the files and directories up to 2 levels deep in {path}, excluding hidden items:\n{stdout}\n"
             return CLIResult(output=stdout, error=stderr)
 
-        file_content = self.read_file(path)
         init_line = 1
         if view_range:
             if len(view_range) != 2 or not all(isinstance(i, int) for i in view_range):
                 raise ToolError(
                     "Invalid `view_range`. It should be a list of two integers."
                 )
-            file_lines = file_content.split("\n")
-            n_lines_file = len(file_lines)
+            index = self._large_file_index(path)
+            if index is not None:
+                n_lines_file = index.line_count
+            else:
+                file_lines = self.read_file(path).split("\n")
+                n_lines_file = len(file_lines)
             init_line, final_line = view_range
             if init_line < 1 or init_line > n_lines_file:
                 raise ToolError(
@@ -196,10 +209,24 @@ class StrReplaceEditor(BaseTool):
                     f"Invalid `view_range`: {view_range}. Its second element `{final_line}` should be larger or equal than its first `{init_line}`"
                 )
 
-            if final_line == -1:
+            if index is not None:
+                # Only the requested lines are read, through the line index
+                file_content = self._read_large(
+                    path, index.read_lines, init_line, final_line
+                )
+            elif final_line == -1:
                 file_content = "\n".join(file_lines[init_line - 1 :])
             else:
                 file_content = "\n".join(file_lines[init_line - 1 : final_line])
+        else:
+            file_content = None
+            if self._file_size(path) >= LARGE_FILE_BYTES:
+                # The output is truncated anyway; don't read past what is shown
+                file_content = self._read_large(
+                    path, read_head, path, MAX_RESPONSE_LEN + 1
+                )
+            if file_content is None:
+                file_content = self.read_file(path)
 
         return CLIResult(
             output=self._make_output(file_content, str(path), init_line=init_line)
@@ -207,8 +234,21 @@ class StrReplaceEditor(BaseTool):
 
     def str_replace(self, path: Path, old_str: str, new_str: str | None):
         """Implement the str_replace command, which replaces old_str with new_str in the file content"""
+        index = self._large_file_index(path)
+        if index is not None and not index.has_tab:
+            edited = self._str_replace_in_place(
+                path,
+                index,
+                old_str.expandtabs(),
+                new_str.expandtabs() if new_str is not None else "",
+            )
+            if edited is not None:
+                start_line, snippet = edited
+                return self._edited(path, snippet, start_line)
+
         # Read the file content
-        file_content = self.read_file(path).expandtabs()
+        on_disk = self.read_file(path)
+        file_content = on_disk.expandtabs()
         old_str = old_str.expandtabs()
         new_str = new_str.expandtabs() if new_str is not None else ""
 
@@ -236,7 +276,7 @@ class StrReplaceEditor(BaseTool):
         self.write_file(path, new_file_content)
 
         # Save the content to history
-        self._file_history[path].append(file_content)
+        self._file_history.record(path, new_file_content, file_content, on_disk)
 
         # Create a snippet of the edited section
         replacement_line = file_content.split(old_str)[0].count("\n")
@@ -244,7 +284,10 @@ class StrReplaceEditor(BaseTool):
         end_line = replacement_line + SNIPPET_LINES + new_str.count("\n")
         snippet = "\n".join(new_file_content.split("\n")[start_line : end_line + 1])
 
-        # Prepare the success message
+        return self._edited(path, snippet, start_line)
+
+    def _edited(self, path: Path, snippet: str, start_line: int) -> CLIResult:
+        """Success message of str_replace, showing the snippet from 0-based `start_line`."""
         success_msg = f"The file {path} has been edited. "
         success_msg += self._make_output(
             snippet, f"a snippet of {path}", start_line + 1
@@ -253,17 +296,47 @@ class StrReplaceEditor(BaseTool):
 
         return CLIResult(output=success_msg)
 
+    def _str_replace_in_place(
+        self, path: Path, index: LineIndex, old_str: str, new_str: str
+    ) -> Optional[tuple[int, str]]:
+        """str_replace on a large file without tabs, patching only the bytes from
+        the match on. Returns (start line, snippet), or None if `old_str` does not
+        occur exactly once and the regular path should report it."""
+        old, new = old_str.encode(), new_str.encode()
+        try:
+            matches = index.find(old)
+            if not matches:
+                raise ToolError(
+                    f"No replacement was performed, old_str `{old_str}` did not appear verbatim in {path}."
+                )
+            if len(matches) > 1:
+                return None
+            offset = matches[0]
+            start_line = max(0, index.line_of(offset) - SNIPPET_LINES)
+            snippet_start = index.line_start(start_line + 1)
+            removed, new_length, crc = splice(path, offset, len(old), new)
+            self._file_history.record_splice(
+                path, offset, removed, len(new), new_length, crc
+            )
+            snippet = read_span(path, snippet_start, offset + len(new), SNIPPET_LINES)
+        except (OSError, ValueError) as e:
+            raise ToolError(f"Ran into {e} while trying to write to {path}") from None
+        return start_line, snippet
+
     def insert(self, path: Path, insert_line: int, new_str: str):
         """Implement the insert command, which inserts new_str at the specified line in the file content."""
-        file_text = self.read_file(path).expandtabs()
         new_str = new_str.expandtabs()
+        index = self._large_file_index(path)
+        if index is not None and not index.has_tab:
+            self._check_insert_line(insert_line, index.line_count)
+            snippet = self._insert_in_place(path, index, insert_line, new_str)
+            return self._inserted(path, snippet, insert_line)
+
+        on_disk = self.read_file(path)
+        file_text = on_disk.expandtabs()
         file_text_lines = file_text.split("\n")
         n_lines_file = len(file_text_lines)
-
-        if insert_line < 0 or insert_line > n_lines_file:
-            raise ToolError(
-                f"Invalid `insert_line` parameter: {insert_line}. It should be within the range of lines of the file: {[0, n_lines_file]}"
-            )
+        self._check_insert_line(insert_line, n_lines_file)
 
         new_str_lines = new_str.split("\n")
         new_file_text_lines = (
@@ -281,8 +354,19 @@ class StrReplaceEditor(BaseTool):
         snippet = "\n".join(snippet_lines)
 
         self.write_file(path, new_file_text)
-        self._file_history[path].append(file_text)
+        self._file_history.record(path, new_file_text, file_text, on_disk)
+
+        return self._inserted(path, snippet, insert_line)
 
+    @staticmethod
+    def _check_insert_line(insert_line: int, n_lines_file: int) -> None:
+        if insert_line < 0 or insert_line > n_lines_file:
+            raise ToolError(
+                f"Invalid `insert_line` parameter: {insert_line}. It should be within the range of lines of the file: {[0, n_lines_file]}"
+            )
+
+    def _inserted(self, path: Path, snippet: str, insert_line: int) -> CLIResult:
+        """Success message of insert."""
         success_msg = f"The file {path} has been edited. "
         success_msg += self._make_output(
             snippet,
@@ -292,12 +376,33 @@ class StrReplaceEditor(BaseTool):
         success_msg += "Review the changes and make sure they are as expected (correct indentation, no duplicate lines, etc). Edit the file again if necessary."
         return CLIResult(output=success_msg)
 
+    def _insert_in_place(
+        self, path: Path, index: LineIndex, insert_line: int, new_str: str
+    ) -> str:
+        """insert on a large file without tabs, patching only the bytes from the
+        insertion point on. Returns the snippet."""
+        new = new_str.encode()
+        try:
+            snippet_start = index.line_start(max(0, insert_line - SNIPPET_LINES) + 1)
+            if insert_line < index.line_count:
+                offset = index.line_start(insert_line + 1)
+                data, lines_after = new + b"\n", SNIPPET_LINES - 1
+            else:
+                offset, data, lines_after = index.size, b"\n" + new, 0
+            _, new_length, crc = splice(path, offset, 0, data)
+            self._file_history.record_splice(
+                path, offset, b"", len(data), new_length, crc
+            )
+            return read_span(path, snippet_start, offset + len(data), lines_after)
+        except (OSError, ValueError) as e:
+            raise ToolError(f"Ran into {e} while trying to write to {path}") from None
+
     def undo_edit(self, path: Path):
         """Implement the undo_edit command."""
-        if not self._file_history[path]:
+        if not self._file_history.has_edits(path):
             raise ToolError(f"No edit history found for {path}.")
 
-        old_text = self._file_history[path].pop()
+        old_text = self._file_history.undo(path, self.read_file(path))
         self.write_file(path, old_text)
 
         return CLIResult(
@@ -311,6 +416,26 @@ class StrReplaceEditor(BaseTool):
         except Exception as e:
             raise ToolError(f"Ran into {e} while trying to read {path}") from None
 
+    def _file_size(self, path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except OSError as e:
+            raise ToolError(f"Ran into {e} while trying to read {path}") from None
+
+    def _large_file_index(self, path: Path) -> Optional[LineIndex]:
+        """Line index of a large file whose bytes map directly to its text, else None."""
+        if self._file_size(path) < LARGE_FILE_BYTES:
+            return None
+        index = self._read_large(path, get_line_index, path)
+        return index if index.plain else None
+
+    def _read_large(self, path: Path, read, *args):
+        """Call `read(*args)`; raise a ToolError like read_file if it fails."""
+        try:
+            return read(*args)
+        except Exception as e:
+            raise ToolError(f"Ran into {e} while trying to read {path}") from None
+
     def write_file(self, path: Path, file: str):
         """Write the content of a file to a given path; raise a ToolError if an error occurs."""
         try:
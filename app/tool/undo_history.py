@@ -0,0 +1,247 @@
+"""Compact undo history for StrReplaceEditor.
+
+Instead of a full copy of the file per edit, each edit stores a reverse diff:
+the UTF-8 bytes that differ between the written and the previous version, plus
+the common prefix/suffix lengths. All histories share one byte budget; the least
+recently edited files lose their oldest undo steps first.
+
+For files up to `SNAPSHOT_MAX_BYTES`, a step also keeps the full text it restores
+while it is the newest step, or if the file was modified outside the editor
+before the next edit (its diff no longer connects to that edit). Undo then
+still restores exactly what the edit replaced, as full copies did. For larger
+files modified outside the editor, undo raises a ToolError rather than guess.
+"""
+
+import weakref
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.exceptions import ToolError
+
+
+UNDO_HISTORY_MAX_BYTES: int = 64 * 1024 * 1024
+SNAPSHOT_MAX_BYTES: int = 1024 * 1024
+_BLOCK = 4096
+
+
+def _common_prefix_len(a: bytes, b: bytes) -> int:
+    limit = min(len(a), len(b))
+    start = 0
+    # Compare whole blocks first (C-speed), then finish inside the first mismatch
+    while (
+        start + _BLOCK <= limit
+        and a[start : start + _BLOCK] == b[start : start + _BLOCK]
+    ):
+        start += _BLOCK
+    while start < limit and a[start] == b[start]:
+        start += 1
+    return start
+
+
+def _common_suffix_len(a: bytes, b: bytes, limit: int) -> int:
+    length = 0
+    while (
+        length + _BLOCK <= limit
+        and a[len(a) - length - _BLOCK : len(a) - length]
+        == b[len(b) - length - _BLOCK : len(b) - length]
+    ):
+        length += _BLOCK
+    while length < limit and a[len(a) - length - 1] == b[len(b) - length - 1]:
+        length += 1
+    return length
+
+
+class ReverseDiff:
+    """Turns the content written by an edit back into the content it replaced."""
+
+    __slots__ = ("prefix", "suffix", "middle", "new_length", "new_crc", "snapshot")
+
+    def __init__(
+        self, prefix: int, suffix: int, middle: bytes, new_length: int, new_crc: int
+    ):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.middle = middle
+        # Identify the content this diff applies to without keeping it
+        self.new_length = new_length
+        self.new_crc = new_crc
+        # Full previous content, if kept (see the module docstring)
+        self.snapshot: Optional[bytes] = None
+
+    @classmethod
+    def between(cls, new: bytes, old: bytes) -> "ReverseDiff":
+        prefix = _common_prefix_len(new, old)
+        limit = min(len(new), len(old)) - prefix
+        suffix = _common_suffix_len(new, old, limit)
+        return cls(
+            prefix, suffix, old[prefix : len(old) - suffix], len(new), zlib.crc32(new)
+        )
+
+    @property
+    def size(self) -> int:
+        """Approximate memory held by this diff, in bytes."""
+        return len(self.middle) + len(self.snapshot or b"") + 64
+
+    def applies_to(self, data: bytes) -> bool:
+        return len(data) == self.new_length and zlib.crc32(data) == self.new_crc
+
+    def apply(self, data: bytes) -> bytes:
+        """Previous content; `data` must be the content the edit wrote."""
+        return data[: self.prefix] + self.middle + data[len(data) - self.suffix :]
+
+
+class UndoBudget:
+    """Byte budget shared by all undo histories, evicting least recently used."""
+
+    def __init__(self, max_bytes: int = UNDO_HISTORY_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        # (id(history), path) -> [weakref to history, bytes held]
+        self._entries: "OrderedDict[Tuple[int, Path], list]" = OrderedDict()
+
+    def charge(self, history: "UndoHistory", path: Path, nbytes: int) -> None:
+        key = (id(history), path)
+        entry = self._entries.setdefault(key, [weakref.ref(history), 0])
+        entry[1] += nbytes
+        self.total_bytes += nbytes
+        self._entries.move_to_end(key)
+        self._evict(keep=key)
+
+    def refund(self, history: "UndoHistory", path: Path, nbytes: int) -> None:
+        key = (id(history), path)
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry[1] -= nbytes
+        self.total_bytes -= nbytes
+        if entry[1] <= 0:
+            del self._entries[key]
+
+    def forget(self, history_id: int) -> None:
+        """Drop everything charged by a history that was garbage-collected."""
+        for key in [key for key in self._entries if key[0] == history_id]:
+            self.total_bytes -= self._entries.pop(key)[1]
+
+    def _evict(self, keep: Tuple[int, Path]) -> None:
+        while self.total_bytes > self.max_bytes:
+            key = next(iter(self._entries))
+            history = self._entries[key][0]()
+            if history is None:
+                self.forget(key[0])
+                continue
+            # Always keep the newest undo step of the file just edited
+            if key == keep and len(history._edits.get(key[1], ())) <= 1:
+                return
+            history._drop_oldest(key[1])
+
+
+_default_budget = UndoBudget()
+
+
+class UndoHistory:
+    """Undo stacks for the files edited by one editor instance."""
+
+    def __init__(self, budget: Optional[UndoBudget] = None):
+        self.budget = budget or _default_budget
+        self._edits: Dict[Path, List[ReverseDiff]] = {}
+        weakref.finalize(self, self.budget.forget, id(self))
+
+    def record(
+        self,
+        path: Path,
+        new_text: str,
+        old_text: str,
+        on_disk: Optional[str] = None,
+    ) -> None:
+        """Remember that undoing the edit that wrote `new_text` restores `old_text`.
+
+        `on_disk` is the file as read before the edit. If it differs from
+        `old_text` (e.g. tabs were expanded), the previous undo step is rebased
+        so that it applies to `old_text`, which is what undoing this edit writes.
+        """
+        new, old = new_text.encode(), old_text.encode()
+        edits = self._edits.get(path)
+        if edits and on_disk is not None:
+            current = on_disk.encode()
+            if edits[-1].applies_to(current) and not edits[-1].applies_to(old):
+                self._replace_top(
+                    path, ReverseDiff.between(old, edits[-1].apply(current))
+                )
+        if edits and edits[-1].applies_to(old):
+            # Undoing this edit leaves the file as the previous step expects
+            self._set_snapshot(path, edits[-1], None)
+        diff = ReverseDiff.between(new, old)
+        self._push(path, diff)
+        self._set_snapshot(path, diff, old)
+
+    def record_splice(
+        self,
+        path: Path,
+        offset: int,
+        removed: bytes,
+        inserted: int,
+        new_length: int,
+        new_crc: int,
+    ) -> None:
+        """Remember an in-place edit that replaced `removed` at byte `offset`
+        with `inserted` bytes, leaving a file of `new_length` bytes."""
+        suffix = new_length - offset - inserted
+        self._push(path, ReverseDiff(offset, suffix, removed, new_length, new_crc))
+
+    def has_edits(self, path: Path) -> bool:
+        return bool(self._edits.get(path))
+
+    def undo(self, path: Path, current_text: str) -> str:
+        """Return the text before the last edit.
+
+        If the file no longer matches what that edit wrote, this is the step's
+        snapshot. Without one (large files), raises ToolError and keeps the step.
+        """
+        current = current_text.encode()
+        edits = self._edits[path]
+        diff = edits[-1]
+        if diff.applies_to(current):
+            old = diff.apply(current)
+        elif diff.snapshot is not None:
+            old = diff.snapshot
+        else:
+            raise ToolError(
+                f"Cannot undo the last edit to {path}: the file was changed since "
+                "then, and it is too large for the editor to have kept a copy of "
+                "its previous content."
+            )
+        edits.pop()
+        self.budget.refund(self, path, diff.size)
+        if not edits:
+            del self._edits[path]
+        elif edits[-1].snapshot is None and edits[-1].applies_to(old):
+            self._set_snapshot(path, edits[-1], edits[-1].apply(old))
+        return old.decode(errors="replace")
+
+    def _push(self, path: Path, diff: ReverseDiff) -> None:
+        self._edits.setdefault(path, []).append(diff)
+        self.budget.charge(self, path, diff.size)
+
+    def _set_snapshot(
+        self, path: Path, diff: ReverseDiff, snapshot: Optional[bytes]
+    ) -> None:
+        if snapshot is not None and len(snapshot) > SNAPSHOT_MAX_BYTES:
+            snapshot = None
+        before = diff.size
+        diff.snapshot = snapshot
+        self.budget.refund(self, path, before)
+        self.budget.charge(self, path, diff.size)
+
+    def _replace_top(self, path: Path, diff: ReverseDiff) -> None:
+        previous = self._edits[path][-1]
+        self._edits[path][-1] = diff
+        self.budget.refund(self, path, previous.size)
+        self.budget.charge(self, path, diff.size)
+
+    def _drop_oldest(self, path: Path) -> None:
+        diff = self._edits[path].pop(0)
+        if not self._edits[path]:
+            del self._edits[path]
+        self.budget.refund(self, path, diff.size)
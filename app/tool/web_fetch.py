@@ -0,0 +1,318 @@
+import asyncio
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Set
+
+from app.config import PROJECT_ROOT
+from app.logger import logger
+from app.tool.base import BaseTool
+from app.tool.http_client import get_http_client
+
+
+CACHE_DIR = PROJECT_ROOT / ".cache" / "web_fetch"
+CACHE_FRESH_SECONDS = 600  # reuse without revalidating
+CACHE_MAX_AGE = 7 * 24 * 3600  # entries not rewritten for this long are removed
+CACHE_MAX_BYTES = 100 * 1024 * 1024  # then the oldest go until the rest fits
+CACHE_PRUNE_INTERVAL = 600
+MAX_DOWNLOAD_BYTES = 5 * 1024 * 1024
+MAX_CONCURRENT_FETCHES = 8
+EXTRACT_WORKERS = 2
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.5",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+}
+
+
+_WORKER_SCRIPT = str(Path(__file__).with_name("html_text_worker.py"))
+# Requests carry a whole page on one line
+_STREAM_LIMIT = 64 * 1024 * 1024
+
+
+class _ExtractWorker:
+    """One html_text_worker process; handles one page at a time."""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+
+    @classmethod
+    async def start(cls) -> "_ExtractWorker":
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-u",
+            _WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=_STREAM_LIMIT,
+        )
+        return cls(process)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def request(self, html: str) -> dict:
+        self.process.stdin.write(json.dumps({"html": html}).encode() + b"\n")
+        await self.process.stdin.drain()
+        line = await self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("text extraction worker exited unexpectedly")
+        return json.loads(line)
+
+    def kill(self) -> None:
+        if self.alive:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+
+
+class _Extractor:
+    """Up to `size` extraction workers shared by all fetches, started on demand.
+
+    Parsing large pages is CPU bound, so it runs in child processes rather than
+    on the event loop. The workers are standalone scripts: they don't import
+    `app` (its config, logger and tools), so they start quickly.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: List[_ExtractWorker] = []
+
+    async def html_to_text(self, html: str) -> str:
+        self._bind_loop()
+        worker = await self._idle.get()  # None: a worker slot not started yet
+        try:
+            if worker is None or not worker.alive:
+                self._discard(worker)
+                worker = await _ExtractWorker.start()
+                self._workers.append(worker)
+            reply = await worker.request(html)
+        except BaseException:
+            # A worker interrupted mid-request would reply out of turn
+            self._discard(worker)
+            worker = None
+            raise
+        finally:
+            self._idle.put_nowait(worker)
+        if "error" in reply:
+            raise ValueError(reply["error"])
+        return reply["text"]
+
+    def _discard(self, worker: Optional[_ExtractWorker]) -> None:
+        if worker is not None:
+            worker.kill()
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+    def _bind_loop(self) -> None:
+        # Subprocess transports belong to the loop that created them
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        for worker in self._workers:
+            worker.kill()
+        self._workers = []
+        self._loop = loop
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            self._idle.put_nowait(None)
+        loop.create_task(self._kill_on_shutdown())
+
+    async def _kill_on_shutdown(self) -> None:
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            workers, self._workers = self._workers, []
+            for worker in workers:
+                worker.kill()
+            await asyncio.gather(
+                *(worker.process.wait() for worker in workers), return_exceptions=True
+            )
+            raise
+
+
+_extractor = _Extractor(EXTRACT_WORKERS)
+
+
+_last_prune = float("-inf")  # time.monotonic() of the last _prune_cache
+
+
+def _cache_path(url: str) -> Path:
+    return CACHE_DIR / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+
+def _read_cache(url: str) -> Optional[dict]:
+    try:
+        return json.loads(_cache_path(url).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(url: str, entry: dict) -> None:
+    global _last_prune
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path = _cache_path(url)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+    except OSError as e:
+        logger.warning(f"Could not cache {url}: {e}")
+    if time.monotonic() - _last_prune >= CACHE_PRUNE_INTERVAL:
+        _last_prune = time.monotonic()
+        _prune_cache()
+
+
+def _prune_cache() -> None:
+    """Remove entries older than CACHE_MAX_AGE, then the oldest entries until
+    the cache fits in CACHE_MAX_BYTES."""
+    files = []
+    for path in CACHE_DIR.glob("*"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+    total = sum(size for _, size, _ in files)
+    cutoff = time.time() - CACHE_MAX_AGE
+    for mtime, size, path in files:
+        if mtime >= cutoff and total <= CACHE_MAX_BYTES:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+class WebFetch(BaseTool):
+    name: str = "web_fetch"
+    description: str = """Download several web pages at once and return their main text.
+Use this tool after a search to read the result pages, instead of opening them one by one in the browser.
+Text repeated across pages (navigation, footers) is only shown once. Use the browser for pages that need interaction or JavaScript.
+"""
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "urls": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "(required) The URLs of the pages to fetch.",
+            },
+            "max_chars": {
+                "type": "integer",
+                "description": "(optional) Maximum number of characters of text returned per page. Default is 2000.",
+                "default": 2000,
+            },
+        },
+        "required": ["urls"],
+    }
+    speculative_safe: bool = True
+    concurrency_safe: bool = True
+
+    async def execute(self, urls: List[str], max_chars: int = 2000) -> str:
+        """
+        Fetch the pages concurrently and return deduplicated snippets of their text.
+
+        Args:
+            urls (List[str]): The URLs to fetch.
+            max_chars (int, optional): Maximum characters of text per page. Default is 2000.
+
+        Returns:
+            str: One section per URL, in the order given.
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+
+        async def fetch(url: str) -> str:
+            async with semaphore:
+                return await self._fetch_text(url)
+
+        if isinstance(urls, str):
+            # A single URL passed as a string rather than a one-item list
+            urls = [urls]
+        urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(
+            *(fetch(url) for url in urls), return_exceptions=True
+        )
+
+        seen: Set[str] = set()
+        sections = []
+        for i, (url, result) in enumerate(zip(urls, results), 1):
+            # BaseException: a cancelled fetch comes back as CancelledError
+            if isinstance(result, BaseException):
+                reason = str(result).split("\n")[0] or type(result).__name__
+                body = f"(fetch failed: {reason})"
+            else:
+                body = self._snippet(result, seen, max_chars) or "(no text content)"
+            sections.append(f"[{i}] {url}\n{body}")
+        return "\n\n".join(sections)
+
+    async def _fetch_text(self, url: str) -> str:
+        """Text of a page, from the disk cache when it is fresh or still valid."""
+        cached = await asyncio.to_thread(_read_cache, url)
+        if cached and time.time() - cached["fetched_at"] < CACHE_FRESH_SECONDS:
+            return cached["text"]
+
+        headers = dict(HEADERS)
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with get_http_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and cached:
+                text = cached["text"]
+            else:
+                response.raise_for_status()
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) >= MAX_DOWNLOAD_BYTES:
+                        break
+                text = await self._extract(
+                    bytes(body),
+                    response.headers.get("content-type", ""),
+                    response.encoding,
+                )
+            entry = {
+                "url": url,
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "fetched_at": time.time(),
+                "text": text,
+            }
+        await asyncio.to_thread(_write_cache, url, entry)
+        return text
+
+    @staticmethod
+    async def _extract(body: bytes, content_type: str, encoding: Optional[str]) -> str:
+        content = body.decode(encoding or "utf-8", errors="replace")
+        if "html" in content_type or content.lstrip()[:1] == "<":
+            return await _extractor.html_to_text(content)
+        if content_type.startswith("text/") or "json" in content_type:
+            return content
+        raise ValueError(f"unsupported content type {content_type or 'unknown'}")
+
+    @staticmethod
+    def _snippet(text: str, seen: Set[str], max_chars: int) -> str:
+        """Paragraphs of `text` not already in `seen`, up to `max_chars` characters."""
+        paragraphs = []
+        length = 0
+        for paragraph in text.split("\n\n"):
+            key = " ".join(paragraph.split()).lower()
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            paragraph = paragraph.strip()
+            if length + len(paragraph) > max_chars:
+                paragraphs.append(paragraph[: max(max_chars - length, 0)] + "...")
+                break
+            paragraphs.append(paragraph)
+            length += len(paragraph) + 2
+        return "\n\n".join(paragraphs)
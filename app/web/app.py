@@ -1,5 +1,5 @@
 from fastapi import FastAPI, WebSocket, Request, BackgroundTasks, HTTPException, WebSocketDisconnect
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import asyncio
@@ -21,6 +21,12 @@ from app.agent.manus import Manus
 from app.flow.base import FlowType
 from app.flow.flow_factory import FlowFactory
 from app.logger import logger
+from app.tool.artifact_store import (
+    ARTIFACT_URL_PREFIX,
+    resolve_artifact,
+    session_workspace,
+)
+from app.tool.output_capture import output_progress
 from app.web.log_handler import capture_session_logs, get_logs
 from app.web.thinking_tracker import ThinkingTracker, generate_thinking_steps
 from app.web.log_parser import parse_log_file, get_latest_log_info, get_all_logs_info
@@ -480,6 +486,24 @@ async def get_file_content(file_path: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading file: {str(e)}")
 
+# 工具产物（截图等）接口：文件名即内容哈希，内容不会变化，可长期缓存并支持Range请求
+@app.get(ARTIFACT_URL_PREFIX + "{artifact_path:path}")
+async def get_artifact(artifact_path: str, request: Request):
+    """获取工具产物文件"""
+    try:
+        full_path = resolve_artifact(artifact_path)
+    except ValueError:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    if not full_path.is_file():
+        raise HTTPException(status_code=404, detail="Artifact not found")
+
+    etag = f'"{full_path.name.split(".")[0]}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(full_path, headers=headers)
+
 # 修改process_prompt函数，处理工作区
 async def process_prompt(session_id: str, prompt: str):
     # 获取会话工作区
@@ -552,6 +576,17 @@ async def process_prompt(session_id: str, prompt: str):
             # 直接记录用户输入的prompt
             ThinkingTracker.add_communication(session_id, "用户输入", prompt)
             
+            # 将工具命令的实时输出推送到该会话的WebSocket
+            def on_tool_output(source: str, text: str):
+                ThinkingTracker.add_log_entry(session_id, {
+                    "level": "DEBUG",
+                    "message": f"[{source}] {text}"
+                })
+
+            output_progress.set(on_tool_output)
+            # 工具（如 bash）以本会话的工作区为起始目录，而不是进程当前目录
+            session_workspace.set(workspace_dir.resolve())
+
             # 初始化代理和任务流程
             ThinkingTracker.add_thinking_step(session_id, "初始化AI代理和任务流程")
             agent = Manus()
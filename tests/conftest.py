@@ -0,0 +1,26 @@
+import pytest
+
+
+class FakeClock:
+    """A time source that only moves when the test advances it."""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """Install a FakeClock as `<module>.time.<function>` and return it."""
+
+    def install(module: str, function: str = "monotonic") -> FakeClock:
+        clock = FakeClock(1000.0)
+        monkeypatch.setattr(f"{module}.time.{function}", clock)
+        return clock
+
+    return install
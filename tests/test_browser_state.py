@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+from app.tool.browser_use_tool import BrowserUseTool
+from app.tool.dom_state import UNCHANGED_NOTE, PageState
+
+
+class FakePage:
+    url = "https://example.com"
+
+    async def evaluate(self, script: str) -> str:
+        return "doc:3:1"
+
+    async def title(self) -> str:
+        return "Example"
+
+
+class FakeContext:
+    def __init__(self):
+        self.page = FakePage()
+        self.state_requests = 0
+
+    async def get_current_page(self) -> FakePage:
+        return self.page
+
+    async def get_tabs_info(self) -> list:
+        return []
+
+    async def get_state(self):
+        self.state_requests += 1
+        raise AssertionError("the element tree should not be rebuilt")
+
+
+def test_unchanged_page_returns_a_marker_without_rebuilding(monkeypatch):
+    context = FakeContext()
+    tool = BrowserUseTool()
+
+    async def ensure_browser(recycle: bool = False) -> FakeContext:
+        return context
+
+    monkeypatch.setattr(tool, "_ensure_browser_initialized", ensure_browser)
+    tool._page_states[id(context.page)] = PageState(
+        "doc:3:1", "[0]<a>Home</a>", {0: "[0]<a>Home</a>"}
+    )
+
+    result = asyncio.run(tool.execute(action="get_state"))
+    state = json.loads(result.output)
+    assert state["interactive_elements_unchanged"] == UNCHANGED_NOTE
+    assert "interactive_elements_changes" not in state
+    assert "interactive_elements" not in state
+    assert context.state_requests == 0
@@ -0,0 +1,63 @@
+import asyncio
+from typing import List
+
+from app.agent.toolcall import ToolCallAgent
+from app.llm import LLM
+from app.schema import Memory, Message
+
+
+def add_turns(memory: Memory, start: int, stop: int) -> None:
+    for i in range(start, stop):
+        memory.add_message(Message.user_message(f"step {i}"))
+        memory.add_message(Message.assistant_message(f"result {i} " + "r" * 200))
+
+
+def test_threshold_defaults_to_three_quarters_of_the_input_budget(monkeypatch):
+    llm = LLM()
+    monkeypatch.setattr(llm, "max_input_tokens", 8000)
+    monkeypatch.setattr(llm, "compaction_threshold", None)
+    agent = ToolCallAgent(llm=llm)
+    assert agent.memory.max_tokens == 8000
+    assert agent.compaction_threshold == 6000
+
+    monkeypatch.setattr(llm, "compaction_threshold", 0)
+    assert ToolCallAgent(llm=llm).compaction_threshold == 0
+
+
+def test_eviction_while_a_summary_is_in_flight():
+    async def scenario():
+        release = asyncio.Event()
+        summarized: List[List[Message]] = []
+
+        class Agent(ToolCallAgent):
+            async def _summarize(self, messages: List[Message]) -> str:
+                summarized.append(messages)
+                await release.wait()
+                return "the story so far"
+
+        agent = Agent(
+            memory=Memory(max_tokens=600),
+            compaction_threshold=400,
+            compaction_keep_messages=4,
+        )
+        agent.memory.add_message(Message.user_message("the task"))
+        add_turns(agent.memory, 0, 8)
+        agent.maybe_compact_memory()
+        await asyncio.sleep(0)
+        assert summarized and summarized[0][0].content == "the task"
+
+        # The run goes on and evicts part of the range being summarized
+        add_turns(agent.memory, 8, 14)
+        assert agent.memory.messages[0].content == "the task"
+        release.set()
+        await agent._compaction_task
+        return agent.memory
+
+    memory = asyncio.run(scenario())
+    assert memory.messages[0].content.endswith("the story so far")
+    assert memory.messages[-1].content.startswith("result 13")
+    assert "the task" not in [m.content for m in memory.messages]
+
+    add_turns(memory, 14, 30)
+    assert memory.messages[0].content.endswith("the story so far")
+    assert memory.total_tokens <= 600
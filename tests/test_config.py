@@ -0,0 +1,35 @@
+from app.config import config
+
+
+def load(monkeypatch, raw: dict):
+    monkeypatch.setattr(config, "_config", config._config)
+    monkeypatch.setattr(config, "_load_config", lambda: raw)
+    config._load_initial_config()
+    return config.llm
+
+
+RAW = {
+    "llm": {
+        "model": "m",
+        "base_url": "http://default:1/v1",
+        "api_key": "k",
+        "endpoints": ["http://default:1/v1", "http://default:2/v1"],
+        "vision": {"model": "v"},
+        "remote": {"model": "r", "base_url": "http://remote/v1"},
+        "remote_pool": {
+            "base_url": "http://remote/v1",
+            "endpoints": ["http://remote/v1", "http://remote2/v1"],
+        },
+    }
+}
+
+
+def test_overrides_inherit_default_endpoints_only_for_the_default_server(
+    monkeypatch,
+):
+    llm = load(monkeypatch, RAW)
+    assert llm["default"].endpoints == RAW["llm"]["endpoints"]
+    assert llm["vision"].endpoints == RAW["llm"]["endpoints"]
+    assert llm["remote"].endpoints == []
+    assert llm["remote"].base_url == "http://remote/v1"
+    assert llm["remote_pool"].endpoints == ["http://remote/v1", "http://remote2/v1"]
@@ -0,0 +1,50 @@
+from app.tool.dom_state import (
+    PageState,
+    content_version,
+    element_changes,
+    parse_elements,
+)
+
+
+ELEMENTS_TEXT = """[0]<a>Home</a>
+*[1]<button>Search</button>
+Results for "cats"
+[2]<input placeholder="Query">"""
+
+
+def elements(n):
+    return {i: f"[{i}]<a>link {i}</a>" for i in range(n)}
+
+
+def test_parse_elements_keeps_following_text_lines():
+    parsed = parse_elements("header text\n" + ELEMENTS_TEXT)
+    assert sorted(parsed) == [0, 1, 2]
+    assert parsed[1] == '*[1]<button>Search</button>\nResults for "cats"'
+    assert parsed[2] == '[2]<input placeholder="Query">'
+
+
+def test_tokens():
+    state = PageState(token="doc1:5:3", elements_text="", elements={})
+    assert state.document_id == "doc1"
+    assert content_version("doc1:5:3") == content_version("doc1:5:9") == "doc1:5"
+    assert content_version("doc1:6:3") != "doc1:5"
+
+
+def test_small_changes_are_reported_as_a_diff():
+    old = elements(20)
+    new = dict(old)
+    new[3] = "[3]<a>renamed</a>"
+    new[20] = "[20]<button>new</button>"
+    del new[7]
+    changes = element_changes(old, new)
+    assert changes["unchanged_count"] == 18
+    assert changes["added_or_changed"] == "[3]<a>renamed</a>\n[20]<button>new</button>"
+    assert changes["removed_indices"] == [7]
+
+
+def test_large_changes_need_the_full_list():
+    old = elements(100)
+    new = {i: f"[{i}]<p>other</p>" for i in range(40)}
+    assert element_changes(old, new) is None
+    # Small pages may always change up to five elements
+    assert element_changes(elements(2), {}) is not None
@@ -0,0 +1,81 @@
+import zlib
+
+import pytest
+
+from app.tool import file_index
+from app.tool.file_index import LineIndex, get_line_index, read_span, splice
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    # Several checkpoints even for small files
+    monkeypatch.setattr(file_index, "BLOCK_SIZE", 16)
+
+
+@pytest.fixture
+def text():
+    return "".join(f"line {i}\n" for i in range(1, 101)) + "last"
+
+
+def test_read_lines_matches_split(tmp_path, text):
+    path = tmp_path / "f.txt"
+    path.write_bytes(text.encode())
+    index = LineIndex(path)
+    lines = text.split("\n")
+    assert index.line_count == len(lines)
+    for first, last in [(1, 1), (1, 5), (7, 40), (99, -1), (100, 101), (50, 500)]:
+        expected = "\n".join(lines[first - 1 : None if last == -1 else last])
+        assert index.read_lines(first, last) == expected
+
+
+def test_line_start_and_line_of_agree(tmp_path, text):
+    path = tmp_path / "f.txt"
+    path.write_bytes(text.encode())
+    index = LineIndex(path)
+    data = text.encode()
+    for line in (1, 2, 10, 57, 101):
+        offset = index.line_start(line)
+        assert offset == 0 or data[offset - 1 : offset] == b"\n"
+        assert index.line_of(offset) == line - 1
+
+
+def test_find_returns_non_overlapping_offsets(tmp_path):
+    path = tmp_path / "f.txt"
+    path.write_bytes(b"aaaa-aa")
+    index = LineIndex(path)
+    assert index.find(b"aa") == [0, 2]
+    assert index.find(b"aa", limit=5) == [0, 2, 5]
+    assert index.find(b"zz") == []
+
+
+def test_index_is_rebuilt_when_the_file_changes(tmp_path):
+    path = tmp_path / "f.txt"
+    path.write_bytes(b"a\nb\n")
+    index = get_line_index(path)
+    assert get_line_index(path) is index
+    path.write_bytes(b"a\nb\nc\nd\n")
+    rebuilt = get_line_index(path)
+    assert rebuilt is not index
+    assert rebuilt.line_count == 5
+
+
+def test_read_span_extends_to_following_lines(tmp_path):
+    path = tmp_path / "f.txt"
+    path.write_bytes(b"one\ntwo\nthree\nfour\n")
+    assert read_span(path, 4, 6, 0) == "two"
+    assert read_span(path, 4, 6, 1) == "two\nthree"
+    assert read_span(path, 4, 6, 10) == "two\nthree\nfour\n"
+
+
+@pytest.mark.parametrize("insert", [b"", b"X", b"a much longer replacement " * 4])
+def test_splice_rewrites_in_place(tmp_path, text, insert):
+    path = tmp_path / "f.txt"
+    original = text.encode()
+    path.write_bytes(original)
+    offset = original.index(b"line 42")
+    removed, size, crc = splice(path, offset, 7, insert)
+    expected = original[:offset] + insert + original[offset + 7 :]
+    assert removed == b"line 42"
+    assert path.read_bytes() == expected
+    assert size == len(expected)
+    assert crc == zlib.crc32(expected)
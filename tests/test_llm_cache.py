@@ -0,0 +1,74 @@
+import asyncio
+
+from app.llm_cache import LLMCache
+
+
+def test_make_key_is_stable_and_order_independent():
+    a = LLMCache.make_key(model="m", messages=[{"role": "user"}], temperature=0.5)
+    b = LLMCache.make_key(temperature=0.5, messages=[{"role": "user"}], model="m")
+    c = LLMCache.make_key(model="m", messages=[{"role": "user"}], temperature=0.7)
+    assert a == b
+    assert a != c
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = LLMCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"  # "b" is now the oldest
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_disk_tier_survives_restart_and_refills_memory(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = LLMCache(path=path, max_entries=1)
+    cache.set("a", "1")
+    cache.set("b", "2")  # pushes "a" out of memory, not off disk
+    assert cache.get("a") == "1"
+    assert cache.stats()["disk_entries"] == 2
+
+    reopened = LLMCache(path=path)
+    assert reopened.get("b") == "2"
+    assert reopened.stats()["memory_entries"] == 1
+
+
+def test_expired_entries_are_misses(tmp_path, fake_clock):
+    clock = fake_clock("app.llm_cache", "time")
+    cache = LLMCache(path=tmp_path / "cache.sqlite3", ttl=60)
+    cache.set("a", "1")
+    clock.advance(30)
+    assert cache.get("a") == "1"
+    clock.advance(31)
+    assert cache.get("a") is None
+    assert cache.stats()["disk_entries"] == 0
+
+
+def test_disk_tier_is_capped_by_access_time(tmp_path, fake_clock):
+    clock = fake_clock("app.llm_cache", "time")
+    cache = LLMCache(path=tmp_path / "cache.sqlite3", max_entries=1, disk_max_entries=2)
+    for key in ("a", "b"):
+        clock.advance(1)
+        cache.set(key, key)
+    clock.advance(1)
+    assert cache.get("a") == "a"  # from disk; "b" is now least recently used
+    clock.advance(1)
+    cache.set("c", "c")
+    assert cache.stats()["disk_entries"] == 2
+    assert LLMCache(path=tmp_path / "cache.sqlite3").get("b") is None
+
+
+def test_async_variants_share_the_tiers(tmp_path):
+    async def scenario():
+        cache = LLMCache(path=tmp_path / "cache.sqlite3", max_entries=1)
+        assert await cache.aget("a") is None
+        await cache.aset("a", "1")
+        await cache.aset("b", "2")
+        assert await cache.aget("a") == "1"
+        assert cache.get("b") == "2"
+        return cache.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["hits"], stats["misses"]) == (2, 1)
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from openai import APIConnectionError
+
+from app.llm_pool import Endpoint, EndpointPool
+
+
+def make_pool(n=2, **kwargs):
+    return EndpointPool(
+        [Endpoint(f"http://box{i}", client=i) for i in range(n)], **kwargs
+    )
+
+
+def test_latency_is_an_ewma():
+    pool = make_pool(1, alpha=0.5)
+    endpoint = pool.endpoints[0]
+    pool.record_success(endpoint, 2.0)
+    assert endpoint.latency == 2.0
+    pool.record_success(endpoint, 4.0)
+    assert endpoint.latency == pytest.approx(3.0)
+    pool.record_success(endpoint, 1.0)
+    assert endpoint.latency == pytest.approx(2.0)
+
+
+def test_pick_prefers_unmeasured_then_fastest_endpoint():
+    pool = make_pool(2)
+    fast, slow = pool.endpoints
+    pool.record_success(slow, 2.0)
+    assert pool.pick() is fast
+    pool.record_success(fast, 0.5)
+    assert pool.pick() is fast
+    fast.in_flight = 4  # 0.5 * 5 > 2.0 * 1
+    assert pool.pick() is slow
+
+
+def test_ejection_after_consecutive_failures_and_cooldown(fake_clock):
+    clock = fake_clock("app.llm_pool")
+    pool = make_pool(2, failure_threshold=2, cooldown=30)
+    bad, good = pool.endpoints
+    pool.record_success(good, 5.0)
+    pool.record_failure(bad, RuntimeError("boom"))
+    assert bad.is_available(clock.now)
+    pool.record_failure(bad, RuntimeError("boom"))
+    assert not bad.is_available(clock.now)
+    assert pool.pick() is good
+
+    clock.advance(30)
+    assert bad.is_available(clock.now)
+    pool.record_success(bad, 1.0)
+    assert (bad.failures, bad.ejected_until) == (0, 0.0)
+
+
+def test_all_ejected_picks_the_one_back_soonest(fake_clock):
+    clock = fake_clock("app.llm_pool")
+    pool = make_pool(2, failure_threshold=1, cooldown=30)
+    first, second = pool.endpoints
+    pool.record_failure(first, RuntimeError())
+    clock.advance(5)
+    pool.record_failure(second, RuntimeError())
+    assert pool.pick() is first
+
+
+def test_lease_records_endpoint_errors_only(fake_clock):
+    clock = fake_clock("app.llm_pool")
+
+    async def scenario():
+        pool = make_pool(1, failure_threshold=5)
+        endpoint = pool.endpoints[0]
+        with pytest.raises(ValueError):
+            async with pool.lease():
+                assert endpoint.in_flight == 1
+                raise ValueError("bad request")
+        assert endpoint.failures == 0
+
+        with pytest.raises(APIConnectionError):
+            async with pool.lease():
+                raise APIConnectionError(request=None)
+        assert endpoint.failures == 1
+
+        async with pool.lease() as lease:
+            clock.advance(0.25)
+            lease.responded()
+            clock.advance(10)  # the rest of the stream doesn't count
+        assert endpoint.latency == pytest.approx(0.25)
+        assert endpoint.failures == 0
+        assert endpoint.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_empty_pool_is_rejected():
+    with pytest.raises(ValueError):
+        EndpointPool([])
@@ -0,0 +1,47 @@
+from openai.types.chat.chat_completion_chunk import (
+    ChoiceDeltaToolCall,
+    ChoiceDeltaToolCallFunction,
+)
+
+from app.llm_stream import ToolCallAssembler
+
+
+def delta(index, id=None, name=None, arguments=None):
+    return ChoiceDeltaToolCall(
+        index=index,
+        id=id,
+        function=ChoiceDeltaToolCallFunction(name=name, arguments=arguments),
+    )
+
+
+def test_call_is_ready_once_its_arguments_parse():
+    assembler = ToolCallAssembler()
+    assert assembler.feed([delta(0, id="call_0", name="bash")]) == []
+    assert assembler.feed([delta(0, arguments='{"command": ')]) == []
+    assert assembler.feed([delta(0, arguments='"ls {}')]) == []
+    ready = assembler.feed([delta(0, arguments='"}')])
+    assert [(c.id, c.function.name) for c in ready] == [("call_0", "bash")]
+    assert ready[0].function.arguments == '{"command": "ls {}"}'
+    assert assembler.feed([delta(0, arguments="")]) == []
+    assert assembler.finish() == []
+
+
+def test_next_index_completes_the_previous_call():
+    assembler = ToolCallAssembler()
+    assembler.feed([delta(0, id="a", name="first", arguments="not json")])
+    ready = assembler.feed([delta(1, id="b", name="second")])
+    assert [c.id for c in ready] == ["a"]
+    assert [c.id for c in assembler.finish()] == ["b"]
+    assert [c.id for c in assembler.tool_calls()] == ["a", "b"]
+
+
+def test_several_calls_in_one_chunk():
+    assembler = ToolCallAssembler()
+    ready = assembler.feed(
+        [
+            delta(0, id="a", name="x", arguments="{}"),
+            delta(1, id="b", name="y", arguments='{"k": 1}'),
+        ]
+    )
+    assert [c.id for c in ready] == ["a", "b"]
+    assert assembler.finish() == []
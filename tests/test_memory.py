@@ -0,0 +1,170 @@
+import json
+from itertools import count
+
+from app.schema import Function, Memory, Message, ToolCall
+
+
+_ids = count()
+
+
+def tool_turn(memory: Memory, name: str, output: str = "ok", **args) -> None:
+    call = ToolCall(
+        id=f"call_{next(_ids)}",
+        function=Function(name=name, arguments=json.dumps(args)),
+    )
+    memory.add_message(Message.user_message("next step"))
+    memory.add_message(Message.from_tool_calls(tool_calls=[call], content="thinking"))
+    memory.add_message(Message.tool_message(output, name=name, tool_call_id=call.id))
+
+
+def test_consecutive_identical_calls_are_repeats():
+    memory = Memory()
+    tool_turn(memory, "bash", command="ls")
+    for expected in (0, 1, 2):
+        tool_turn(memory, "bash", command="pytest")
+        assert memory.repeat_count() == expected
+
+
+def test_argument_order_and_reasoning_text_do_not_matter():
+    memory = Memory()
+    tool_turn(memory, "editor", path="/a", command="view")
+    tool_turn(memory, "editor", command="view", path="/a")
+    assert memory.repeat_count() == 1
+
+
+def test_alternating_edit_and_test_loop_is_not_stuck():
+    memory = Memory()
+    for i in range(3):
+        tool_turn(memory, "editor", command="str_replace", path="/a", new_str=str(i))
+        tool_turn(memory, "bash", command="pytest")
+    assert memory.repeat_count() == 0
+
+
+def test_same_call_after_other_actions_is_not_a_repeat():
+    memory = Memory()
+    for url in ("https://a", "https://b", "https://c"):
+        tool_turn(memory, "browser_use", action="go_to_url", url=url)
+        tool_turn(memory, "browser_use", action="get_text", output=url)
+    assert memory.repeat_count() == 0
+
+
+def test_text_turns_repeat_by_content():
+    memory = Memory()
+    for _ in range(3):
+        memory.add_message(Message.user_message("continue"))
+        memory.add_message(Message.assistant_message("I am done."))
+    assert memory.repeat_count() == 2
+    memory.add_message(Message.assistant_message("Something new"))
+    assert memory.repeat_count() == 0
+
+
+def assert_groups_intact(memory: Memory) -> None:
+    """Every tool reply follows the assistant message that called it."""
+    open_calls = set()
+    for message in memory.messages:
+        if message.role == "tool":
+            assert message.tool_call_id in open_calls
+        elif message.tool_calls:
+            open_calls = {call.id for call in message.tool_calls}
+        else:
+            open_calls = set()
+
+
+def test_history_is_kept_within_the_token_budget():
+    memory = Memory(max_tokens=400)
+    memory.add_message(Message.user_message("the task"))
+    for i in range(30):
+        tool_turn(memory, "bash", output="x" * 200, command=f"step {i}")
+        assert memory.total_tokens <= 400
+        assert_groups_intact(memory)
+    assert memory.messages[0].content == "the task"
+    assert memory.messages[-1].content == "x" * 200
+
+
+def test_old_tool_outputs_are_compacted_before_anything_is_evicted():
+    memory = Memory(max_tokens=1000, compact_tool_tokens=50)
+    memory.add_message(Message.user_message("the task"))
+    tool_turn(memory, "bash", output="a" * 2000, command="one")
+    tool_turn(memory, "bash", output="b" * 2000, command="two")
+    assert len(memory.messages) == 7
+    assert memory.messages[3].content.startswith("a" * 100 + "\n... [")
+    assert memory.messages[-1].content == "b" * 2000
+
+
+def test_large_newest_output_keeps_the_task_and_is_truncated():
+    memory = Memory(max_tokens=300)
+    memory.add_message(Message.user_message("the task"))
+    tool_turn(memory, "bash", output="y" * 3000, command="cat big.log")
+    assert memory.messages[0].content == "the task"
+    assert memory.total_tokens <= 300
+    assert memory.messages[-1].role == "tool"
+    assert memory.messages[-1].content.startswith("y" * 100)
+    assert "characters of tool output removed" in memory.messages[-1].content
+    assert_groups_intact(memory)
+
+
+def test_max_messages_never_splits_a_call_from_its_replies():
+    memory = Memory(max_messages=5)
+    memory.add_message(Message.user_message("the task"))
+    for i in range(6):
+        tool_turn(memory, "bash", command=str(i))
+        assert len(memory.messages) <= 5
+        assert_groups_intact(memory)
+    assert memory.messages[0].content == "the task"
+
+
+def test_first_message_is_pinned_only_if_it_is_the_task():
+    memory = Memory(max_tokens=100)
+    memory.add_message(Message.assistant_message("a" * 200))
+    memory.add_message(Message.user_message("b" * 200))
+    assert [m.content[0] for m in memory.messages] == ["b"]
+
+
+def test_summary_replaces_what_is_left_of_the_range_and_is_kept():
+    memory = Memory(max_tokens=300)
+    memory.add_message(Message.user_message("the task"))
+    for i in range(4):
+        tool_turn(memory, "bash", output="o" * 100, command=str(i))
+    end = memory.mark(7)  # task and the first two turns
+    # Eviction passes the mark while the summary is being written
+    for i in range(4, 12):
+        tool_turn(memory, "bash", output="o" * 100, command=str(i))
+    latest = memory.messages[-3:]
+    oldest_call = memory.messages[2].tool_calls[0].function.arguments
+    assert json.loads(oldest_call)["command"] not in ("0", "1")
+
+    assert memory.replace_prefix(end, Message.user_message("summary"))
+    assert memory.messages[0].content == "summary"
+    assert "the task" not in [m.content for m in memory.messages]
+    assert memory.messages[-3:] == latest
+
+    for i in range(12, 20):
+        tool_turn(memory, "bash", output="o" * 100, command=str(i))
+    assert memory.messages[0].content == "summary"
+    assert memory.total_tokens <= 300
+    assert_groups_intact(memory)
+
+
+def test_summary_keeps_messages_after_the_mark():
+    memory = Memory()
+    memory.add_message(Message.user_message("the task"))
+    for i in range(3):
+        tool_turn(memory, "bash", command=str(i))
+    end = memory.mark(4)
+    tool_turn(memory, "bash", command="3")
+    assert memory.replace_prefix(end, Message.user_message("summary"))
+    assert [m.role for m in memory.messages] == ["user"] + [
+        "user",
+        "assistant",
+        "tool",
+    ] * 3
+    assert memory.messages[1].content == "next step"
+
+
+def test_stale_mark_is_rejected():
+    memory = Memory()
+    memory.add_message(Message.user_message("the task"))
+    end = memory.mark(1)
+    memory.set_messages([Message.user_message("other task")])
+    assert not memory.replace_prefix(end, Message.user_message("summary"))
+    assert memory.messages[0].content == "other task"
@@ -0,0 +1,49 @@
+from app.tool.page_text import ChunkedText, tokenize
+
+
+def test_tokenize_splits_latin_words_and_cjk_characters():
+    assert tokenize("Hello, World 42! 你好") == ["hello", "world", "42", "你", "好"]
+
+
+def test_chunks_cover_the_text_and_end_at_lines():
+    text = "".join(f"line number {i}\n" for i in range(200))
+    chunked = ChunkedText(text, chunk_chars=100)
+    assert "".join(chunked.chunk(i) for i in range(len(chunked))) == text
+    for i in range(len(chunked) - 1):
+        assert chunked.chunk(i).endswith("\n")
+        assert len(chunked.chunk(i)) <= 100
+
+
+def test_unbroken_text_is_cut_at_the_chunk_size():
+    chunked = ChunkedText("x" * 250, chunk_chars=100)
+    assert chunked.offsets == [(0, 100), (100, 200), (200, 250)]
+
+
+def test_empty_text_has_one_chunk():
+    chunked = ChunkedText("")
+    assert len(chunked) == 1
+    assert chunked.render(0) == "[chunk 0 of 1, characters 0-0 of 0]\n"
+
+
+def test_search_ranks_by_bm25():
+    filler = "lorem ipsum dolor sit amet " * 3
+    chunks = [
+        filler + "pricing\n",
+        filler + "pricing pricing pricing plans\n",
+        filler + "contact us\n",
+        "pricing " + filler * 6 + "\n",
+    ]
+    chunked = ChunkedText("".join(chunks))
+    # One chunk per paragraph above
+    chunked.offsets = []
+    start = 0
+    for chunk in chunks:
+        chunked.offsets.append((start, start + len(chunk)))
+        start += len(chunk)
+
+    # More occurrences rank higher; a long chunk with one occurrence ranks last
+    assert chunked.search("pricing") == [1, 0, 3]
+    # Rare terms outweigh common ones
+    assert chunked.search("contact lorem")[0] == 2
+    assert chunked.search("pricing plans", limit=1) == [1]
+    assert chunked.search("nothing here") == []
@@ -0,0 +1,27 @@
+import asyncio
+
+from app.tool.artifact_store import session_workspace
+from app.tool.python_execute import PythonExecute
+
+
+def test_code_runs_in_the_session_workspace(tmp_path):
+    async def scenario():
+        tool = PythonExecute()
+        try:
+            results = []
+            for name in ("first", "second"):
+                workspace = tmp_path / name
+                token = session_workspace.set(workspace)
+                try:
+                    results.append(
+                        await tool.execute("import os; print(os.getcwd())", timeout=30)
+                    )
+                finally:
+                    session_workspace.reset(token)
+            return results
+        finally:
+            await tool.cleanup()
+
+    first, second = asyncio.run(scenario())
+    assert first["observation"].strip() == str(tmp_path / "first")
+    assert second["observation"].strip() == str(tmp_path / "second")
@@ -0,0 +1,87 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.rate_limiter import AdmissionController, TokenBucket, retry_after_seconds
+
+
+def test_bucket_starts_full_and_refills_at_rate(fake_clock):
+    clock = fake_clock("app.rate_limiter")
+    bucket = TokenBucket(rate_per_minute=60)  # one token per second
+    assert bucket.delay_for(60) == 0
+    bucket.consume(60)
+    assert bucket.delay_for(1) == pytest.approx(1.0)
+    clock.advance(0.5)
+    assert bucket.delay_for(1) == pytest.approx(0.5)
+    clock.advance(10)
+    assert bucket.delay_for(10) == 0
+    assert bucket.delay_for(11) == pytest.approx(0.5)
+
+
+def test_bucket_refill_is_capped_at_capacity(fake_clock):
+    clock = fake_clock("app.rate_limiter")
+    bucket = TokenBucket(rate_per_minute=60, capacity=5)
+    bucket.consume(5)
+    clock.advance(3600)
+    bucket.consume(5)
+    assert bucket.tokens == pytest.approx(0)
+
+
+def test_requests_larger_than_capacity_are_clamped(fake_clock):
+    fake_clock("app.rate_limiter")
+    bucket = TokenBucket(rate_per_minute=60, capacity=10)
+    assert bucket.delay_for(1000) == 0
+    bucket.consume(1000)
+    assert bucket.tokens == pytest.approx(0)
+    assert bucket.delay_for(1000) == pytest.approx(10.0)
+
+
+def test_admission_waits_for_the_request_bucket():
+    async def scenario():
+        controller = AdmissionController(requests_per_minute=600)  # 10 per second
+        controller._requests.tokens = 0
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        async with controller.admit():
+            assert controller.in_flight == 1
+        return loop.time() - started, controller
+
+    waited, controller = asyncio.run(scenario())
+    assert waited >= 0.09
+    assert controller.in_flight == 0
+    assert controller.queue_depth == 0
+
+
+def test_admission_caps_concurrency():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=2)
+        peak = 0
+
+        async def request():
+            nonlocal peak
+            async with controller.admit():
+                peak = max(peak, controller.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(request() for _ in range(6)))
+        return peak
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_for_config_shares_one_controller_per_name():
+    first = AdmissionController.for_config("test-shared", max_concurrency=1)
+    assert AdmissionController.for_config("test-shared") is first
+    assert AdmissionController.for_config("test-other") is not first
+
+
+def test_retry_after_headers():
+    def error(headers):
+        return SimpleNamespace(response=SimpleNamespace(headers=headers))
+
+    assert retry_after_seconds(error({"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(error({"retry-after": "7"})) == 7.0
+    assert retry_after_seconds(error({"retry-after": "soon"})) is None
+    assert retry_after_seconds(error({})) is None
+    assert retry_after_seconds(ValueError()) is None
@@ -0,0 +1,121 @@
+import asyncio
+import json
+from typing import List, Optional, Tuple
+
+from app.agent.toolcall import ToolCallAgent
+from app.schema import Function, ToolCall
+from app.tool import Terminate, ToolCollection
+from app.tool.base import BaseTool, file_resource
+from app.tool.file_saver import FileSaver
+from app.tool.str_replace_editor import StrReplaceEditor
+
+
+class Recorder:
+    def __init__(self):
+        self.events: List[Tuple[str, str]] = []
+
+    def span(self, label: str) -> Tuple[int, int]:
+        return (
+            self.events.index(("start", label)),
+            self.events.index(("end", label)),
+        )
+
+    def overlap(self, a: str, b: str) -> bool:
+        start_a, end_a = self.span(a)
+        start_b, end_b = self.span(b)
+        return start_a < end_b and start_b < end_a
+
+
+class RecordingTool(BaseTool):
+    description: str = "records when it runs"
+    recorder: Recorder
+
+    async def execute(self, label: str, path: str = "") -> str:
+        self.recorder.events.append(("start", label))
+        await asyncio.sleep(0.01)
+        self.recorder.events.append(("end", label))
+        return label
+
+
+class WritingTool(RecordingTool):
+    def concurrency_key(self, path: str = "", **kwargs) -> Optional[str]:
+        return file_resource(path)
+
+
+def call(name: str, **args) -> ToolCall:
+    return ToolCall(
+        id=f"call_{args['label']}",
+        function=Function(name=name, arguments=json.dumps(args)),
+    )
+
+
+def make_agent(recorder: Recorder) -> ToolCallAgent:
+    tools = ToolCollection(
+        RecordingTool(name="fetch", recorder=recorder, concurrency_safe=True),
+        RecordingTool(name="python", recorder=recorder),
+        WritingTool(name="write", recorder=recorder),
+        Terminate(),
+    )
+    return ToolCallAgent(available_tools=tools)
+
+
+def test_mixed_reply_respects_ordering_and_overlap():
+    recorder = Recorder()
+    agent = make_agent(recorder)
+    commands = [
+        call("fetch", label="fetch1"),
+        call("write", label="write_a", path="/tmp/x/a.csv"),
+        call("write", label="write_b", path="/tmp/x/b.csv"),
+        call("write", label="write_a2", path="/tmp/x/../x/a.csv"),
+        call("python", label="python"),
+        call("fetch", label="fetch2"),
+        call("terminate", label="done", status="success"),
+    ]
+    results = asyncio.run(agent._run_tool_calls(commands))
+
+    assert [r.rsplit("\n", 1)[-1] for r in results[:6]] == [
+        "fetch1",
+        "write_a",
+        "write_b",
+        "write_a2",
+        "python",
+        "fetch2",
+    ]
+    # Safe calls and writes to different files overlap
+    assert recorder.overlap("fetch1", "write_a")
+    assert recorder.overlap("write_a", "write_b")
+    # Writes to the same resolved path run in order
+    assert recorder.span("write_a")[1] < recorder.span("write_a2")[0]
+    # An exclusive call waits for everything before it and blocks what follows
+    python_start, python_end = recorder.span("python")
+    for label in ("fetch1", "write_a", "write_b", "write_a2"):
+        assert recorder.span(label)[1] < python_start
+    assert python_end < recorder.span("fetch2")[0]
+
+
+def test_file_tools_share_a_key_per_resolved_path(tmp_path):
+    path = str(tmp_path / "data.csv")
+    saver = FileSaver().concurrency_key(file_path=path, content="")
+    editor = StrReplaceEditor().concurrency_key(
+        path=str(tmp_path / "sub" / ".." / "data.csv"), command="view"
+    )
+    assert saver == editor
+    assert FileSaver().concurrency_key(file_path=str(tmp_path / "other")) != saver
+
+
+def test_unsafe_tools_are_exclusive_by_default():
+    recorder = Recorder()
+    agent = make_agent(recorder)
+    commands = [call("python", label="p1"), call("python", label="p2")]
+    asyncio.run(agent._run_tool_calls(commands))
+    assert not recorder.overlap("p1", "p2")
+
+
+def test_stuck_prompt_is_added_once():
+    agent = ToolCallAgent()
+    prompt = agent.next_step_prompt
+    agent.handle_stuck_state()
+    once = agent.next_step_prompt
+    agent.handle_stuck_state()
+    assert agent.next_step_prompt == once
+    assert once.endswith(prompt) and once != prompt
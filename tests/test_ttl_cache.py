@@ -0,0 +1,32 @@
+from app.tool.ttl_cache import TTLCache
+
+
+def test_entries_expire_after_ttl(fake_clock):
+    clock = fake_clock("app.tool.ttl_cache")
+    cache = TTLCache(ttl=10)
+    cache.set("a", 1)
+    clock.advance(10)
+    assert cache.get("a") == 1
+    clock.advance(0.1)
+    assert cache.get("a") is None
+
+
+def test_setting_again_extends_the_lifetime(fake_clock):
+    clock = fake_clock("app.tool.ttl_cache")
+    cache = TTLCache(ttl=10)
+    cache.set("a", 1)
+    clock.advance(8)
+    cache.set("a", 2)
+    clock.advance(8)
+    assert cache.get("a") == 2
+
+
+def test_oldest_entries_are_evicted_first(fake_clock):
+    fake_clock("app.tool.ttl_cache")
+    cache = TTLCache(ttl=10, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("a", 3)  # refreshed: "b" is now the oldest
+    cache.set("c", 4)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (3, 4)
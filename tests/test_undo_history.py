@@ -0,0 +1,106 @@
+import random
+import zlib
+from pathlib import Path
+
+import pytest
+
+from app.exceptions import ToolError
+from app.tool import undo_history
+from app.tool.undo_history import ReverseDiff, UndoBudget, UndoHistory
+
+
+PATH = Path("/workspace/file.txt")
+
+
+def test_reverse_diff_keeps_only_the_changed_bytes():
+    old = b"a" * 10000 + b"old" + b"z" * 10000
+    new = b"a" * 10000 + b"brand new" + b"z" * 10000
+    diff = ReverseDiff.between(new, old)
+    assert (diff.prefix, diff.suffix, diff.middle) == (10000, 10000, b"old")
+    assert diff.applies_to(new)
+    assert not diff.applies_to(old)
+    assert diff.apply(new) == old
+
+
+def test_reverse_diff_round_trips_random_edits():
+    rng = random.Random(0)
+    for _ in range(200):
+        old = bytes(rng.choice(b"ab\n") for _ in range(rng.randrange(50)))
+        start = rng.randrange(len(old) + 1)
+        end = rng.randrange(start, len(old) + 1)
+        insert = bytes(rng.choice(b"ab\n") for _ in range(rng.randrange(5)))
+        new = old[:start] + insert + old[end:]
+        assert ReverseDiff.between(new, old).apply(new) == old
+
+
+def test_undo_walks_back_through_each_edit():
+    history = UndoHistory(UndoBudget())
+    versions = ["one\n", "one\ntwo\n", "zero\none\ntwo\n", "zero\ntwo\n"]
+    for old, new in zip(versions, versions[1:]):
+        history.record(PATH, new, old, on_disk=old)
+    current = versions[-1]
+    for expected in reversed(versions[:-1]):
+        current = history.undo(PATH, current)
+        assert current == expected
+    assert not history.has_edits(PATH)
+
+
+def test_undo_after_outside_change_restores_the_replaced_text():
+    history = UndoHistory(UndoBudget())
+    history.record(PATH, "a\nB\nc\n", "a\nb\nc\n", on_disk="a\nb\nc\n")
+    # Someone else rewrites the file before the user asks for an undo
+    assert history.undo(PATH, "completely different") == "a\nb\nc\n"
+
+
+def test_outside_change_between_edits_keeps_older_steps_exact():
+    history = UndoHistory(UndoBudget())
+    history.record(PATH, "v1 edited", "v1", on_disk="v1")
+    history.record(PATH, "v2 edited", "v2", on_disk="v2")  # "v2" came from outside
+    assert history.undo(PATH, "v2 edited") == "v2"
+    assert history.undo(PATH, "v2") == "v1"
+
+
+def test_large_files_changed_outside_the_editor_cannot_be_undone(monkeypatch):
+    monkeypatch.setattr(undo_history, "SNAPSHOT_MAX_BYTES", 8)
+    history = UndoHistory(UndoBudget())
+    history.record(PATH, "head NEW tail", "head old tail", on_disk="head old tail")
+    with pytest.raises(ToolError):
+        history.undo(PATH, "HEAD NEW tail")
+    # The step is kept for when the file is back to what the edit wrote
+    assert history.undo(PATH, "head NEW tail") == "head old tail"
+
+
+def test_on_disk_normalization_rebases_the_previous_step():
+    history = UndoHistory(UndoBudget())
+    history.record(PATH, "x\ty", "x y", on_disk="x y")
+    # The editor expanded the tab before the second edit
+    history.record(PATH, "x    z", "x    y", on_disk="x\ty")
+    assert history.undo(PATH, "x    z") == "x    y"
+    assert history.undo(PATH, "x    y") == "x y"
+
+
+def test_budget_drops_oldest_steps_of_least_recently_edited_file():
+    budget = UndoBudget(max_bytes=600)
+    history = UndoHistory(budget)
+    other = Path("/workspace/other.txt")
+    for i in range(3):
+        history.record(PATH, f"{i + 1}" * 100, f"{i}" * 100, on_disk=f"{i}" * 100)
+    history.record(other, "b" * 100, "a" * 100, on_disk="a" * 100)
+    assert budget.total_bytes <= budget.max_bytes
+    assert len(history._edits[PATH]) < 3
+    assert history.undo(other, "b" * 100) == "a" * 100
+
+
+def test_newest_step_survives_even_over_budget():
+    budget = UndoBudget(max_bytes=10)
+    history = UndoHistory(budget)
+    history.record(PATH, "new" * 100, "old" * 100, on_disk="old" * 100)
+    assert history.undo(PATH, "new" * 100) == "old" * 100
+
+
+def test_record_splice_undoes_an_in_place_edit():
+    history = UndoHistory(UndoBudget())
+    old = b"keep REMOVED keep"
+    new = b"keep X keep"
+    history.record_splice(PATH, 5, b"REMOVED", 1, len(new), zlib.crc32(new))
+    assert history.undo(PATH, new.decode()) == old.decode()
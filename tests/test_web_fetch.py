@@ -0,0 +1,44 @@
+import asyncio
+import os
+import time
+
+from app.tool import web_fetch
+from app.tool.web_fetch import WebFetch
+
+
+def test_cache_drops_old_entries_then_oldest_over_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(web_fetch, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(web_fetch, "CACHE_MAX_BYTES", 250)
+    now = time.time()
+    ages = {"expired": web_fetch.CACHE_MAX_AGE + 60, "old": 300, "mid": 200}
+    for name, age in {**ages, "new": 100}.items():
+        path = tmp_path / f"{name}.json"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (now - age, now - age))
+
+    web_fetch._prune_cache()
+    assert sorted(p.stem for p in tmp_path.iterdir()) == ["mid", "new"]
+
+
+def test_writes_prune_at_most_once_per_interval(tmp_path, monkeypatch):
+    pruned = []
+    monkeypatch.setattr(web_fetch, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(web_fetch, "_last_prune", float("-inf"))
+    monkeypatch.setattr(web_fetch, "_prune_cache", lambda: pruned.append(1))
+    for i in range(3):
+        web_fetch._write_cache(f"https://example.com/{i}", {"text": str(i)})
+    assert len(pruned) == 1
+    assert web_fetch._read_cache("https://example.com/2") == {"text": "2"}
+
+
+def test_a_single_url_string_is_one_fetch(monkeypatch):
+    fetched = []
+
+    async def fetch_text(self, url: str) -> str:
+        fetched.append(url)
+        return f"text of {url}"
+
+    monkeypatch.setattr(WebFetch, "_fetch_text", fetch_text)
+    result = asyncio.run(WebFetch().execute(urls="https://example.com"))
+    assert fetched == ["https://example.com"]
+    assert result == "[1] https://example.com\ntext of https://example.com"
@@ -0,0 +1,120 @@
+"""
+会话内存基准 - 测量每个会话在长对话下的常驻内存 (RSS)
+使用方式:
+    1. 直接运行: python tools/bench_memory.py
+    2. 指定规模: python tools/bench_memory.py --sessions 200 --steps 50 --output-kb 16
+
+每个会话运行一个不调用 LLM 的代理，每一步写入一条带工具调用的 assistant 消息
+和一条大小为 --output-kb 的工具输出，与 ToolCallAgent 的内存形态一致。
+
+除总 RSS 外还会分别给出消息文本本身占用的内存和其余开销（消息对象、缓存的
+dict、代理本身）。会话内存主要由工具输出文本决定：16 KB 输出时消息对象开销约为
+每条 1.5 KB，即每个会话 0.15 MB 左右，因此 Message 仍保留为 pydantic 模型。
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import resource
+import sys
+import time
+from pathlib import Path
+
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from openai.types.chat import ChatCompletionMessageToolCall  # noqa: E402
+
+from app.agent.base import BaseAgent  # noqa: E402
+from app.llm import LLM  # noqa: E402
+from app.schema import Message  # noqa: E402
+
+
+class BenchAgent(BaseAgent):
+    """An agent whose steps only append tool-call traffic to memory."""
+
+    name: str = "bench"
+    output_size: int = 16 * 1024
+
+    async def step(self) -> str:
+        call_id = f"call_{self.current_step}"
+        self.memory.add_message(
+            Message.from_tool_calls(
+                content="",
+                tool_calls=[
+                    ChatCompletionMessageToolCall(
+                        id=call_id,
+                        type="function",
+                        function={
+                            "name": "python_execute",
+                            "arguments": '{"code": "print(1)"}',
+                        },
+                    )
+                ],
+            )
+        )
+        # Unique per step, like real tool output
+        output = os.urandom(self.output_size // 2).hex()
+        observation = f"Observed output of cmd `python_execute` executed:\n{output}"
+        self.memory.add_message(
+            Message.tool_message(
+                content=observation, name="python_execute", tool_call_id=call_id
+            )
+        )
+        return observation
+
+
+def rss_kb() -> int:
+    """Current resident set size in KB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def main(sessions: int, steps: int, output_kb: int) -> None:
+    llm = LLM()
+    gc.collect()
+    baseline = rss_kb()
+    started = time.perf_counter()
+
+    agents = []
+    summaries = []
+    for _ in range(sessions):
+        agent = BenchAgent(llm=llm, max_steps=steps, output_size=output_kb * 1024)
+        # Keep the run() summary alive too, as the web app does with results
+        summaries.append(await agent.run("benchmark"))
+        agents.append(agent)
+
+    gc.collect()
+    elapsed = time.perf_counter() - started
+    total = rss_kb() - baseline
+    messages = sum(len(agent.memory.messages) for agent in agents)
+    # Text the sessions must hold anyway: message content plus the run() summary
+    text = sum(
+        len(msg.content or "") for agent in agents for msg in agent.memory.messages
+    ) + sum(len(summary) for summary in summaries)
+    overhead = total - text // 1024
+
+    print(f"sessions:            {sessions}")
+    print(f"messages/session:    {messages // max(sessions, 1)}")
+    print(f"tool output size:    {output_kb} KB")
+    print(f"total RSS growth:    {total / 1024:.1f} MB")
+    print(f"RSS per session:     {total / max(sessions, 1) / 1024:.2f} MB")
+    print(f"  message text:      {text / max(sessions, 1) / 1024 / 1024:.2f} MB")
+    print(f"  other overhead:    {overhead / max(sessions, 1) / 1024:.2f} MB")
+    print(f"overhead/message:    {overhead * 1024 / max(messages, 1):.0f} bytes")
+    print(f"time:                {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure per-session memory")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--output-kb", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.sessions, args.steps, args.output_kb))